@@ -1,11 +1,14 @@
 import os
-from langchain_community.document_loaders import TextLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from sentence_transformers import SentenceTransformer
-import chromadb
-from chromadb.config import Settings
-from chromadb.utils import embedding_functions
-import ollama
+import hashlib
+import json
+import threading
+import time
+from bm25 import BM25Index
+import numpy_index
+
+# langchain (index building only), chromadb, sentence-transformers and ollama are
+# imported where they are used, so the numpy backend never loads ChromaDB and the
+# server does not pay for them at import
 
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
 
@@ -14,35 +17,177 @@ COLLECTION_NAME = "rural_health_knowledge"
 CHUNK_SIZE = 500
 CHUNK_OVERLAP = 50
 EMBED_MODEL = "all-MiniLM-L6-v2"
+KNOWLEDGE_PATH = "rural_health_knowledge.txt"
+MANIFEST_PATH = "nidaan_chromadb_manifest.json"  # Lives next to CHROMA_DB_DIR
+EMBED_BATCH_SIZE = int(os.environ.get("EMBED_BATCH_SIZE", "64"))
+BM25_INDEX_PATH = "nidaan_bm25.json"
+
+# Vector store: "chroma" (ChromaDB in CHROMA_DB_DIR) or "numpy" (memory-mapped
+# embeddings in NUMPY_INDEX_DIR, for small corpora and low-RAM devices)
+VECTOR_BACKEND = os.environ.get("VECTOR_BACKEND", "chroma")
+NUMPY_INDEX_DIR = "nidaan_npindex"
+
+# Retrieval: "dense" (vector only) or "hybrid" (BM25 + vector, fused by reciprocal rank).
+# Dense stays the default until bench.retrieval_quality shows hybrid ahead on the real index
+RETRIEVAL_MODE = os.environ.get("RETRIEVAL_MODE", "dense")
+HYBRID_CANDIDATES = int(os.environ.get("HYBRID_CANDIDATES", "10"))  # taken from each retriever before fusing
+HYBRID_DENSE_WEIGHT = float(os.environ.get("HYBRID_DENSE_WEIGHT", "0.5"))
+RRF_K = 60
+RERANK_MODEL = os.environ.get("RERANK_MODEL", "")  # e.g. cross-encoder/ms-marco-MiniLM-L-6-v2, empty disables
 
 # === 1. Load and Prepare Documents and Embeddings (do once) ===
-def prepare_index(text_path):
+def split_chunks(text_path):
+    """Split the knowledge file into chunks, keeping each chunk's source offset."""
+    from langchain_community.document_loaders import TextLoader
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
     loader = TextLoader(text_path)
     documents = loader.load()
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP, add_start_index=True
+    )
     texts = text_splitter.split_documents(documents)
-    chunk_texts = [doc.page_content for doc in texts]
+    chunks = {}
+    for doc in texts:
+        chunk_hash = hashlib.sha256(doc.page_content.encode("utf-8")).hexdigest()
+        chunk_id = f"chunk_{chunk_hash[:16]}"
+        if chunk_id in chunks:
+            continue  # identical text already indexed
+        chunks[chunk_id] = {
+            "hash": chunk_hash,
+            "start_index": doc.metadata.get("start_index", -1),
+            "text": doc.page_content,
+        }
+    return chunks
+
+def _index_settings():
+    return {"embed_model": EMBED_MODEL, "chunk_size": CHUNK_SIZE, "chunk_overlap": CHUNK_OVERLAP}
+
+def load_manifest(path=MANIFEST_PATH):
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+def _write_manifest(chunks, text_path, path=MANIFEST_PATH):
+    manifest = dict(_index_settings())
+    manifest["source"] = text_path
+    manifest["built_at"] = time.time()
+    manifest["chunks"] = [
+        {"id": chunk_id, "hash": c["hash"], "start_index": c["start_index"], "length": len(c["text"])}
+        for chunk_id, c in sorted(chunks.items(), key=lambda item: item[1]["start_index"])
+    ]
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+    return manifest
+
+def _chunk_metadata(chunk, text_path):
+    return {"chunk_hash": chunk["hash"], "start_index": chunk["start_index"], "source": text_path}
+
+def _batches(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def prepare_index(text_path, batch_size=EMBED_BATCH_SIZE, full=False):
+    """Bring the Chroma collection in line with text_path.
+
+    Chunks are keyed by a hash of their text, so only new or changed chunks
+    are embedded and chunks that disappeared from the file are deleted. A
+    full rebuild happens when asked for, or when the embedding model or
+    chunking settings differ from the ones recorded in the manifest.
+    """
+    import chromadb
+    from chromadb.utils import embedding_functions
+    chunks = split_chunks(text_path)
 
     client = chromadb.PersistentClient(path=CHROMA_DB_DIR)
     embedding_func = embedding_functions.SentenceTransformerEmbeddingFunction(model_name=EMBED_MODEL)
-    try:
-        client.delete_collection(COLLECTION_NAME)
-    except Exception:
-        pass  # ignore if doesn't exist
-    collection = client.create_collection(name=COLLECTION_NAME, embedding_function=embedding_func)
-
-    # Add documents (in ChromaDB you provide a list of documents, each with a unique id)
-    ids = [f"chunk_{i}" for i in range(len(chunk_texts))]
-    collection.add(
-        documents=chunk_texts,
-        ids=ids,
-        metadatas=[{"chunk_id": i} for i in range(len(chunk_texts))]
+    manifest = load_manifest()
+    if manifest is not None and any(manifest.get(k) != v for k, v in _index_settings().items()):
+        print("Index settings changed since the last build: rebuilding from scratch.")
+        full = True
+    if full:
+        try:
+            client.delete_collection(COLLECTION_NAME)
+        except Exception:
+            pass  # ignore if doesn't exist
+    collection = client.get_or_create_collection(name=COLLECTION_NAME, embedding_function=embedding_func)
+
+    existing = collection.get(include=["metadatas"])
+    existing_meta = dict(zip(existing["ids"], existing["metadatas"]))
+    added = [chunk_id for chunk_id in chunks if chunk_id not in existing_meta]
+    removed = [chunk_id for chunk_id in existing_meta if chunk_id not in chunks]
+    moved = [
+        chunk_id for chunk_id in chunks
+        if chunk_id in existing_meta
+        and (existing_meta[chunk_id] or {}).get("start_index") != chunks[chunk_id]["start_index"]
+    ]
+
+    for batch in _batches(removed, batch_size):
+        collection.delete(ids=batch)
+    for batch in _batches(added, batch_size):
+        documents = [chunks[chunk_id]["text"] for chunk_id in batch]
+        collection.add(
+            ids=batch,
+            documents=documents,
+            embeddings=embedding_func(documents),
+            metadatas=[_chunk_metadata(chunks[chunk_id], text_path) for chunk_id in batch]
+        )
+    # Unchanged text that shifted position only needs its offset updated, not re-embedding
+    for batch in _batches(moved, batch_size):
+        collection.update(ids=batch, metadatas=[_chunk_metadata(chunks[chunk_id], text_path) for chunk_id in batch])
+
+    _write_manifest(chunks, text_path)
+    _write_bm25(chunks)
+    print(
+        f"Embedding index updated: {len(added)} added, {len(removed)} removed, "
+        f"{len(chunks) - len(added)} unchanged ({len(chunks)} chunks total)."
     )
-    print(f"Embedding index built with {len(chunk_texts)} chunks.")
-    return client, collection, chunk_texts
+    return client, collection, [c["text"] for c in chunks.values()]
+
+def prepare_numpy_index(text_path, batch_size=EMBED_BATCH_SIZE, full=False):
+    """Build the numpy vector index in NUMPY_INDEX_DIR, re-embedding only new chunks."""
+    chunks = split_chunks(text_path)
+    settings = dict(_index_settings(), source=text_path)
+    added, removed = numpy_index.build_numpy_index(
+        chunks, NUMPY_INDEX_DIR, encode_normalized, settings, batch_size=batch_size, full=full
+    )
+    _write_bm25(chunks)
+    print(
+        f"Numpy index updated: {added} added, {removed} removed, "
+        f"{len(chunks) - added} unchanged ({len(chunks)} chunks total)."
+    )
+
+def build_index(text_path, backend=VECTOR_BACKEND, batch_size=EMBED_BATCH_SIZE, full=False):
+    if backend == "numpy":
+        prepare_numpy_index(text_path, batch_size=batch_size, full=full)
+    elif backend == "chroma":
+        prepare_index(text_path, batch_size=batch_size, full=full)
+    else:
+        raise ValueError(f"Unknown vector backend: {backend}")
+
+def _write_bm25(chunks):
+    ordered = sorted(chunks.items(), key=lambda item: item[1]["start_index"])
+    BM25Index([chunk_id for chunk_id, _ in ordered], [c["text"] for _, c in ordered]).save(BM25_INDEX_PATH)
+
+_encoder = None
+
+def encode_normalized(texts):
+    """Embed texts with EMBED_MODEL as unit-length float32 rows."""
+    global _encoder
+    if _encoder is None:
+        from sentence_transformers import SentenceTransformer
+        _encoder = SentenceTransformer(EMBED_MODEL)
+    return _encoder.encode(list(texts), batch_size=EMBED_BATCH_SIZE, normalize_embeddings=True).astype("float32")
 
 # === 2. Load Index/Model for Chat Sessions ===
 def load_index():
+    import chromadb
+    from chromadb.utils import embedding_functions
     client = chromadb.PersistentClient(path=CHROMA_DB_DIR)
     embedding_func = embedding_functions.SentenceTransformerEmbeddingFunction(model_name=EMBED_MODEL)
     collection = client.get_or_create_collection(name=COLLECTION_NAME, embedding_function=embedding_func)
@@ -53,16 +198,281 @@ def load_index():
     return client, collection, chunk_texts
 
 # === 3. Chat Supporting Functions ===
-def retrieve_context(query, collection, chunk_texts, top_k=5):
-    # ChromaDB will internally embed the query and do similarity search
+def search_many(queries, collection, top_k=5, query_embeddings=None):
+    """Embed and search several queries in one call.
+
+    Returns one list of hits per query; each hit carries the chunk id,
+    document text, distance and metadata straight from the vector query.
+    Pass query_embeddings when the queries have already been embedded.
+    """
+    queries = list(queries)
+    if not queries:
+        return []
+    if query_embeddings is not None:
+        query = {"query_embeddings": list(query_embeddings)}
+    else:
+        query = {"query_texts": queries}
     results = collection.query(
-        query_texts=[query],
-        n_results=top_k
+        **query,
+        n_results=top_k,
+        include=["documents", "distances", "metadatas"]
     )
-    idxs = results["ids"][0]
-    # Extract chunk IDs from ChromaDB result and fetch the actual text
-    chunk_map = {f"chunk_{i}": chunk_texts[i] for i in range(len(chunk_texts))}
-    return [chunk_map[idx] for idx in idxs]
+    all_hits = []
+    for ids, docs, dists, metas in zip(results["ids"], results["documents"], results["distances"], results["metadatas"]):
+        all_hits.append([
+            {"id": i, "document": d, "distance": dist, "metadata": m or {}}
+            for i, d, dist, m in zip(ids, docs, dists, metas)
+        ])
+    return all_hits
+
+def search(query, collection, top_k=5):
+    return search_many([query], collection, top_k=top_k)[0]
+
+def fuse_hits(dense_hits, sparse_hits, chunk_map, top_k=5, dense_weight=HYBRID_DENSE_WEIGHT):
+    """Merge vector and BM25 results with weighted reciprocal rank fusion.
+
+    Rank-based fusion needs no score normalisation between the two
+    retrievers. Chunks found only by BM25 come back with distance None.
+
+    Equal scores are common (at equal weights the two top hits tie), so ties
+    go to the better rank in either list, then to the chunk BM25 found: an
+    exact term match, such as a scheme name, is what embeddings tend to miss.
+    """
+    fused, best_rank, lexical = {}, {}, set()
+    for rank, hit in enumerate(dense_hits):
+        fused[hit["id"]] = dict(hit, score=dense_weight / (RRF_K + rank + 1))
+        best_rank[hit["id"]] = rank
+    for rank, (chunk_id, bm25_score) in enumerate(sparse_hits):
+        if chunk_id not in fused:
+            if chunk_id not in chunk_map:
+                continue
+            fused[chunk_id] = {"id": chunk_id, "document": chunk_map[chunk_id], "distance": None, "metadata": {}, "score": 0.0}
+        fused[chunk_id]["score"] += (1 - dense_weight) / (RRF_K + rank + 1)
+        fused[chunk_id]["bm25"] = bm25_score
+        best_rank[chunk_id] = min(rank, best_rank.get(chunk_id, rank))
+        lexical.add(chunk_id)
+    order = lambda hit: (-hit["score"], best_rank[hit["id"]], hit["id"] not in lexical)
+    return sorted(fused.values(), key=order)[:top_k]
+
+def retrieve_context(query, collection, top_k=5):
+    return [hit["document"] for hit in search(query, collection, top_k=top_k)]
+
+def retrieve_context_many(queries, collection, top_k=5):
+    return [[hit["document"] for hit in hits] for hits in search_many(queries, collection, top_k=top_k)]
+
+# === 3b. Warm Retrieval Engine (one per server process) ===
+class ChromaStore:
+    """Vector search through the ChromaDB collection"""
+
+    def __init__(self):
+        import chromadb
+        from chromadb.utils import embedding_functions
+        self.embedding_func = embedding_functions.SentenceTransformerEmbeddingFunction(model_name=EMBED_MODEL)
+        self.client = chromadb.PersistentClient(path=CHROMA_DB_DIR)
+        self.collection = self.client.get_or_create_collection(name=COLLECTION_NAME, embedding_function=self.embedding_func)
+        result = self.collection.get(include=["documents"])
+        self.ids, self.documents = result["ids"], result["documents"]
+
+    def embed(self, texts):
+        return self.embedding_func(list(texts))
+
+    def query(self, queries, top_k=5, query_embeddings=None):
+        return search_many(queries, self.collection, top_k=top_k, query_embeddings=query_embeddings)
+
+
+def open_store(backend=VECTOR_BACKEND):
+    if backend == "numpy":
+        return numpy_index.NumpyIndex(NUMPY_INDEX_DIR, encode_normalized)
+    if backend == "chroma":
+        return ChromaStore()
+    raise ValueError(f"Unknown vector backend: {backend}")
+
+
+class LoadedIndex:
+    """What one Retriever.load() produced, swapped in as a whole so a search never mixes two loads."""
+
+    def __init__(self, store=None, chunk_map=None, bm25=None, reranker=None, version=0, loaded_at=None, load_seconds=None):
+        self.store = store
+        self.chunk_map = chunk_map or {}
+        self.bm25 = bm25
+        self.reranker = reranker
+        self.version = version  # bumped on every (re)load so caches built on the old index can be dropped
+        self.loaded_at = loaded_at
+        self.load_seconds = load_seconds
+
+
+class Retriever:
+    """Keeps the vector store, embedding model and chunk index in memory.
+
+    Built once at server startup so a chat turn only pays for the query
+    embedding and the vector search. Call reload() after the knowledge
+    file changes.
+    """
+
+    def __init__(self, text_path=KNOWLEDGE_PATH, backend=VECTOR_BACKEND):
+        self.text_path = text_path
+        self.backend = backend
+        self.mode = RETRIEVAL_MODE
+        self.error = None
+        self.index = LoadedIndex()
+        self._ready = threading.Event()
+        self._attempted = threading.Event()  # set when a load finishes, whether it worked or not
+        self._loading = False
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self):
+        return self._ready.is_set()
+
+    @property
+    def store(self):
+        return self.index.store
+
+    @property
+    def chunk_map(self):
+        return self.index.chunk_map
+
+    @property
+    def bm25(self):
+        return self.index.bm25
+
+    @property
+    def reranker(self):
+        return self.index.reranker
+
+    @property
+    def version(self):
+        return self.index.version
+
+    def load(self):
+        with self._lock:
+            started = time.perf_counter()
+            self._loading = True
+            self._attempted.clear()
+            try:
+                try:
+                    store = open_store(self.backend)
+                except FileNotFoundError:
+                    store = None
+                if store is None or not store.ids:
+                    # Building is an offline step (build_index.py), never done while serving
+                    raise RuntimeError(
+                        f"No embeddings found: run `python build_index.py --backend {self.backend}` to index {self.text_path}"
+                    )
+                # Run one encode so the first real query doesn't pay for model warmup
+                store.embed(["warmup"])
+                chunk_map = dict(zip(store.ids, store.documents))
+                bm25 = self._load_bm25(chunk_map) if self.mode == "hybrid" else None
+                reranker = None
+                if RERANK_MODEL:
+                    from sentence_transformers import CrossEncoder
+                    reranker = CrossEncoder(RERANK_MODEL)
+                    reranker.predict([("warmup", "warmup")])
+
+                # One assignment, so searches running during a reload see the old index or the new one
+                self.index = LoadedIndex(store, chunk_map, bm25, reranker, self.index.version + 1,
+                                         time.time(), time.perf_counter() - started)
+                self.error = None
+                self._ready.set()
+                print(f"Retriever ready with {len(self.chunk_map)} chunks in {self.index.load_seconds:.2f}s.")
+            except Exception as e:
+                self.error = str(e)
+                print(f"Retriever load error: {e}")
+                raise
+            finally:
+                self._loading = False
+                self._attempted.set()
+
+    def _load_bm25(self, chunk_map):
+        # Use the index written by build_index.py when it matches the collection
+        if os.path.exists(BM25_INDEX_PATH):
+            try:
+                bm25 = BM25Index.load(BM25_INDEX_PATH)
+                if set(bm25.ids) == set(chunk_map):
+                    return bm25
+            except (OSError, ValueError, KeyError):
+                pass
+        print("BM25 index missing or stale: building it from the collection.")
+        return BM25Index(list(chunk_map), list(chunk_map.values()))
+
+    def reload(self):
+        """Re-read the index after build_index.py has updated it."""
+        self.load()
+
+    def wait_ready(self, timeout=None):
+        return self._ready.wait(timeout)
+
+    def _require_ready(self, timeout=60):
+        """Wait for a load in progress; fail at once if the last load failed."""
+        if self._ready.is_set():
+            return
+        if self.error and not self._loading:
+            raise RuntimeError(self.error)
+        self._attempted.wait(timeout)
+        if not self._ready.is_set():
+            raise RuntimeError(self.error or "Retriever is not ready")
+
+    def embed(self, texts):
+        self._require_ready()
+        return self.index.store.embed(list(texts))
+
+    def search_many(self, queries, top_k=5, query_embeddings=None):
+        self._require_ready()
+        index = self.index  # read once: a reload may swap it while this search runs
+        queries = list(queries)
+        if index.bm25 is None and index.reranker is None:
+            return index.store.query(queries, top_k=top_k, query_embeddings=query_embeddings)
+
+        candidates = max(top_k, HYBRID_CANDIDATES)
+        dense = index.store.query(queries, top_k=candidates, query_embeddings=query_embeddings)
+        all_hits = []
+        for query, dense_hits in zip(queries, dense):
+            if index.bm25 is not None:
+                hits = fuse_hits(dense_hits, index.bm25.search(query, candidates), index.chunk_map, top_k=candidates)
+            else:
+                hits = dense_hits
+            if index.reranker is not None:
+                scores = index.reranker.predict([(query, hit["document"]) for hit in hits])
+                for hit, score in zip(hits, scores):
+                    hit["rerank_score"] = float(score)
+                hits = sorted(hits, key=lambda hit: hit["rerank_score"], reverse=True)
+            all_hits.append(hits[:top_k])
+        return all_hits
+
+    def search(self, query, top_k=5):
+        return self.search_many([query], top_k=top_k)[0]
+
+    def retrieve(self, query, top_k=5):
+        return [hit["document"] for hit in self.search(query, top_k=top_k)]
+
+    def retrieve_many(self, queries, top_k=5):
+        return [[hit["document"] for hit in hits] for hits in self.search_many(queries, top_k=top_k)]
+
+    def status(self):
+        index = self.index
+        return {
+            "ready": self.ready,
+            "chunks": len(index.chunk_map),
+            "embed_model": EMBED_MODEL,
+            "backend": self.backend,
+            "mode": self.mode,
+            "rerank_model": RERANK_MODEL or None,
+            "loaded_at": index.loaded_at,
+            "load_seconds": index.load_seconds,
+            "error": self.error,
+        }
+
+
+_retriever = None
+_retriever_lock = threading.Lock()
+
+def get_retriever():
+    """Return the process-wide Retriever, creating it (unloaded) on first use."""
+    global _retriever
+    with _retriever_lock:
+        if _retriever is None:
+            _retriever = Retriever()
+        return _retriever
 
 def build_prompt(query, context):
     return f"""You are Nidaan AI — an offline AI nurse trained to help rural patients in India.
@@ -76,6 +486,7 @@ Question: {query}
 Answer:"""
 
 def query_gemma(prompt):
+    import ollama
     response = ollama.chat(
         model='gemma3n:e2b',
         messages=[{'role': 'user', 'content': prompt}]
@@ -85,11 +496,13 @@ def query_gemma(prompt):
 # === 4. Main Chat Loop ===
 def main():
     text_path = "rural_health_knowledge.txt"
-    # Build or load the index
-    if not os.path.exists(CHROMA_DB_DIR):
-        client, collection, chunk_texts = prepare_index(text_path)
-    else:
-        client, collection, chunk_texts = load_index()
+    # Load the index, building it first if it doesn't exist yet
+    retriever = Retriever(text_path)
+    try:
+        retriever.load()
+    except RuntimeError:
+        build_index(text_path)
+        retriever.load()
 
     print("🩺 Welcome to Nidaan AI! Type your health query, or type 'exit' to quit.\n")
 
@@ -98,7 +511,7 @@ def main():
         if query.lower() in ["exit", "quit"]:
             print("👋 Bye! Take care.")
             break
-        context = retrieve_context(query, collection, chunk_texts)
+        context = retriever.retrieve(query)
         prompt = build_prompt(query, context)
         response = query_gemma(prompt)
         print(f"\n🤖 Nidaan AI Says:\n{response}\n")
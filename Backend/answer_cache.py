@@ -0,0 +1,104 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+ANSWER_CACHE_ENABLED = os.environ.get("ANSWER_CACHE_ENABLED", "false").lower() == "true"
+ANSWER_CACHE_THRESHOLD = float(os.environ.get("ANSWER_CACHE_THRESHOLD", "0.92"))  # cosine similarity
+ANSWER_CACHE_TTL_SECONDS = int(os.environ.get("ANSWER_CACHE_TTL_SECONDS", str(24 * 60 * 60)))
+ANSWER_CACHE_MAX_ENTRIES = int(os.environ.get("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+
+
+class AnswerCache:
+    """Answers to first-turn questions, matched on query-embedding similarity.
+
+    An entry is reused only when the new question's embedding is within the
+    similarity threshold, retrieval returned the same chunks and the same
+    model produced it, so a hit would have been answered from identical
+    context. Entries expire after ttl seconds, the oldest are evicted past
+    max_entries, and everything is dropped when the index version changes.
+    """
+
+    def __init__(self, threshold=ANSWER_CACHE_THRESHOLD, ttl=ANSWER_CACHE_TTL_SECONDS, max_entries=ANSWER_CACHE_MAX_ENTRIES):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()  # (model_name, chunk_ids) -> list of (created, embedding, answer)
+        self._size = 0
+        self._index_version = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(embedding):
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, embedding, chunk_ids, model_name, index_version=None):
+        """Return a cached answer for a similar question with the same context, or None."""
+        key = (model_name, tuple(sorted(chunk_ids)))
+        query = self._normalize(embedding)
+        now = time.time()
+        with self._lock:
+            self._check_version(index_version)
+            candidates = [e for e in self._entries.get(key, []) if now - e[0] <= self.ttl]
+            if key in self._entries and len(candidates) != len(self._entries[key]):
+                self._size -= len(self._entries[key]) - len(candidates)
+                self._entries[key] = candidates
+            if candidates:
+                similarities = np.stack([e[1] for e in candidates]) @ query
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return candidates[best][2]
+            self.misses += 1
+            return None
+
+    def store(self, embedding, chunk_ids, model_name, answer, index_version=None):
+        key = (model_name, tuple(sorted(chunk_ids)))
+        with self._lock:
+            self._check_version(index_version)
+            self._entries.setdefault(key, []).append((time.time(), self._normalize(embedding), answer))
+            self._entries.move_to_end(key)
+            self._size += 1
+            # Evict whole least recently used groups until back under the limit
+            while self._size > self.max_entries and self._entries:
+                _, dropped = self._entries.popitem(last=False)
+                self._size -= len(dropped)
+                self.evictions += len(dropped)
+
+    def invalidate(self):
+        with self._lock:
+            self._clear()
+
+    def _check_version(self, index_version):
+        # Caller holds self._lock. Answers built on an older index are stale.
+        if index_version != self._index_version:
+            if self._entries:
+                self._clear()
+            self._index_version = index_version
+
+    def _clear(self):
+        self._entries.clear()
+        self._size = 0
+        self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": ANSWER_CACHE_ENABLED,
+                "entries": self._size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -1,27 +1,58 @@
-from fastapi import FastAPI, UploadFile, File, Form
+from fastapi import FastAPI, UploadFile, File, Form, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, StreamingResponse, Response
+from contextlib import asynccontextmanager
+import asyncio
 import uvicorn
 import os
+import re
 import json
-from pydub import AudioSegment
-from google.cloud import speech
-from google.cloud import texttospeech
-from google.oauth2 import service_account
-from google.cloud import translate_v2 as translate
-import requests
+import time
+from starlette.concurrency import run_in_threadpool
+import httpx
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
 import RAG
+import audio_processing
+import tts_cache as tts_cache_module
+import providers
+import translation
+import prompting
+import metrics
+import sessions as sessions_module
+from answer_cache import AnswerCache, ANSWER_CACHE_ENABLED
+from sentences import SentenceBuffer, line_breaks
 
 
 MODEL_NAME = "nidaan:latest"  # Change to your model name
-API_LINK = "Add your ollama API link here"  # Change to your Ollama API link
+API_LINK = os.environ.get("OLLAMA_API_LINK", "Add your ollama API link here")  # Change to your Ollama API link
+OLLAMA_MAX_CONCURRENCY = int(os.environ.get("OLLAMA_MAX_CONCURRENCY", "8"))  # Generations sent to Ollama at once
+OLLAMA_MAX_CONNECTIONS = int(os.environ.get("OLLAMA_MAX_CONNECTIONS", "32"))
+OLLAMA_CONNECT_TIMEOUT = float(os.environ.get("OLLAMA_CONNECT_TIMEOUT", "10"))
+OLLAMA_READ_TIMEOUT = float(os.environ.get("OLLAMA_READ_TIMEOUT", "120"))  # Max gap between streamed tokens
 
-# Initialize Google Cloud clients with same credentials
-import os
-os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = 'Add your Google Cloud service account JSON key file path here'
-speech_client = speech.SpeechClient()
-texttospeech_client = texttospeech.TextToSpeechClient()
-translate_client = translate.Client()
+CONTEXT_TOP_K = int(os.environ.get("CONTEXT_TOP_K", "3"))  # Knowledge chunks sent with each question
+TTS_SENTENCE_CONCURRENCY = int(os.environ.get("TTS_SENTENCE_CONCURRENCY", "4"))  # Sentences synthesized at once per reply
+AUDIO_DECODE_WORKERS = int(os.environ.get("AUDIO_DECODE_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# Shared by every request; created in lifespan()
+ollama_client = None
+ollama_slots = None
+audio_pool = None
+
+# Speech and translation clients are built on first use; Google clients read the
+# service account key from the GOOGLE_APPLICATION_CREDENTIALS environment variable.
+# PRELOAD_PROVIDERS (comma-separated: stt, tts, translation) builds and warms them up
+# at startup instead, so the first request that needs them does not pay for it.
+# "local" (the default) preloads the providers that run a model on this machine;
+# an empty value preloads nothing.
+PRELOAD_PROVIDERS = [p.strip() for p in os.environ.get("PRELOAD_PROVIDERS", "local").split(",") if p.strip()]
+speech_recognizer = providers.create_speech_recognizer(lazy=True)
+speech_synthesizer = providers.create_speech_synthesizer(lazy=True)
+translator = translation.Translator(providers.create_translation_backend(lazy=True))
+sessions = sessions_module.SessionStore()
+answer_cache = AnswerCache()
+tts_cache = tts_cache_module.TTSCache()
 
 
 system_prompt = (
@@ -51,78 +82,97 @@ End every response with:
 
 
 
-def transcribe_audio_with_google(audio_file_path, language_code="gu-IN"):
-    """Transcribe audio using Google Speech-to-Text API for Gujarati"""
+def transcribe_audio(content, language_code="gu-IN", sample_rate_hertz=None):
+    """Transcribe audio with the configured STT provider (Google Speech-to-Text by default)
+
+    content is LINEAR16 audio: raw PCM at sample_rate_hertz, or a wav file when sample_rate_hertz is None.
+    """
     try:
-        # Read the audio file
-        with open(audio_file_path, "rb") as audio_file:
-            content = audio_file.read()
-        
-        # Configure the recognition
-        audio = speech.RecognitionAudio(content=content)
-        config = speech.RecognitionConfig(
-            encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
-            language_code=language_code,  # Use the provided language code
-            enable_automatic_punctuation=True,
-            enable_word_time_offsets=False,
-            enable_word_confidence=False,
-        )
-        
-        # Perform the transcription
-        response = speech_client.recognize(config=config, audio=audio)
-        
-        # Extract the transcribed text
-        if response.results:
-            transcribed_text = ""
-            for result in response.results:
-                if result.alternatives:
-                    transcribed_text += result.alternatives[0].transcript + " "
-            return transcribed_text.strip()
-        else:
-            return ""
-            
+        return speech_recognizer.transcribe(content, language_code, sample_rate_hertz)
     except Exception as e:
-        print(f"Google Speech-to-Text error: {e}")
+        print(f"Speech-to-Text error ({speech_recognizer.name}): {e}")
         return ""
 
-def chat_with_ollama(message, history):
-    if history is None:
-        history = []
+def build_messages(message, history, context):
+    messages, stats = prompting.build_chat_messages(system_prompt, history, message, context)
+    print(
+        f"Prompt tokens: {stats['total']}/{stats['budget']} "
+        f"(system {stats['system']}, history {stats['history']}, context {stats['context']}, "
+        f"question {stats['question']}; dropped {stats['turns_dropped']} turns, {stats['chunks_dropped']} chunks)"
+    )
+    return messages
 
-    messages = [{"role": "system", "content": system_prompt}]
-    for entry in history:
-        if not (isinstance(entry, dict) and "role" in entry and "content" in entry):
-            continue
-        if entry["role"] in ("user", "assistant"):
-            messages.append({"role": entry["role"], "content": entry["content"]})
-
-    _, collection, chunk_texts = RAG.load_index()
-    # If ChromaDB folder or collection is missing or has no embeddings/chunks, build it
-    if not chunk_texts or len(chunk_texts) == 0:
-        print("No embeddings found: Generating index from rural_health_knowledge.txt...")
-        RAG.prepare_index("rural_health_knowledge.txt")
-        # Try loading again after preparing
-        _, collection, chunk_texts = RAG.load_index()
-    context = RAG.retrieve_context(message, collection, chunk_texts, top_k=3)
-    prompt = RAG.build_prompt(message, context)
-
-    messages.append({"role": "user", "content": prompt})
+def prepare_turn(message, history):
+    """Retrieve context for the message and build the Ollama messages.
+
+    Returns (messages, cache_key). cache_key is set when the answer cache
+    applies (enabled, first turn of a conversation) and holds what cached
+    answers are matched on: the query embedding, retrieved chunk ids and
+    index version.
+    """
+    retriever = RAG.get_retriever()
+    cache_key = None
+    with metrics.span("retrieval"):
+        if ANSWER_CACHE_ENABLED and not history:
+            # Embed once and reuse the vector for both the search and the cache lookup
+            embedding = retriever.embed([message])[0]
+            hits = retriever.search_many([message], top_k=CONTEXT_TOP_K, query_embeddings=[embedding])[0]
+            cache_key = (embedding, [hit["id"] for hit in hits], retriever.version)
+        else:
+            hits = retriever.search(message, top_k=CONTEXT_TOP_K)
+    context = [hit["document"] for hit in hits]
+    with metrics.span("prompt"):
+        messages = build_messages(message, history, context)
+    return messages, cache_key
+
+async def stream_ollama(message, history):
+    """Yield the assistant reply piece by piece as Ollama generates it"""
+    # Retrieval is CPU-bound (query embedding), keep it off the event loop
+    messages, cache_key = await run_in_threadpool(prepare_turn, message, history)
+    if cache_key:
+        embedding, chunk_ids, index_version = cache_key
+        cached = answer_cache.lookup(embedding, chunk_ids, MODEL_NAME, index_version)
+        if cached is not None:
+            yield cached
+            return
 
     data = {"model": MODEL_NAME, "messages": messages}
+    reply_parts = []
+    finished = False
+    # Waiting for a free slot here queues requests instead of overloading Ollama
+    queued = time.perf_counter()
+    async with ollama_slots:
+        started = time.perf_counter()
+        metrics.observe("ollama_queue", queued, started)
+        first_token = True
+        async with ollama_client.stream("POST", "/api/chat", json=data) as response:
+            response.raise_for_status()
+            # Read response line by line (each is a JSON object)
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                resp_chunk = json.loads(line)
+                # Each chunk is a partial response; the final (done) one usually has no content
+                if resp_chunk.get("message", {}).get("content"):
+                    if first_token:
+                        metrics.observe("ollama_first_token", started)
+                        first_token = False
+                    reply_parts.append(resp_chunk["message"]["content"])
+                    yield resp_chunk["message"]["content"]
+                if resp_chunk.get("done"):
+                    finished = True
+                    break
+        metrics.observe("ollama_total", started)
+    # Only complete answers are worth reusing
+    if cache_key and finished and reply_parts:
+        answer_cache.store(embedding, chunk_ids, MODEL_NAME, "".join(reply_parts), index_version)
+
+async def chat_with_ollama(message, history):
+    if history is None:
+        history = []
 
     try:
-        response = requests.post(f"{API_LINK}/api/chat", json=data, stream=True)
-        # Read response line by line (each is a JSON object)
-        assistant_reply = ""
-        for line in response.iter_lines():
-            if not line:
-                continue
-            resp_chunk = json.loads(line)
-            # Each chunk is a partial response. Append content.
-            if "message" in resp_chunk and "content" in resp_chunk["message"]:
-                assistant_reply += resp_chunk["message"]["content"]
-            if resp_chunk.get("done"):
-                break
+        assistant_reply = "".join([token async for token in stream_ollama(message, history)])
 
         new_history = history + [
             {"role": "user", "content": message},
@@ -134,86 +184,129 @@ def chat_with_ollama(message, history):
         return history
 
 
-def generate_google_tts(text, voice_name="gu-IN-Standard-A"):
-    """Generate high-quality Gujarati speech using Google Cloud TTS"""
+def generate_tts(text, voice_name="gu-IN-Standard-A"):
+    """Generate Gujarati speech with the configured TTS provider (Google Cloud TTS by default)
+
+    Returns the filename of the audio in the TTS cache; repeated texts are served from disk.
+    """
     try:
-        # Configure the synthesis input
-        synthesis_input = texttospeech.SynthesisInput(text=text)
-        
-        # Build the voice request
-        voice = texttospeech.VoiceSelectionParams(
-            language_code="gu-IN",
-            name=voice_name,
-            ssml_gender=texttospeech.SsmlVoiceGender.FEMALE
-        )
-        
-        # Select the type of audio file to return
-        audio_config = texttospeech.AudioConfig(
-            audio_encoding=texttospeech.AudioEncoding.MP3
+        return tts_cache.get_or_create(
+            text, voice_name, speech_synthesizer.encoding, lambda: speech_synthesizer.synthesize(text, voice_name)
         )
-        
-        # Perform the text-to-speech request
-        response = texttospeech_client.synthesize_speech(
-            input=synthesis_input, voice=voice, audio_config=audio_config
-        )
-        
-        # Save the audio to a file
-        output_filename = "google_tts_output.mp3"
-        with open(output_filename, "wb") as out:
-            out.write(response.audio_content)
-        
-        return output_filename
-        
     except Exception as e:
-        print(f"Google TTS error: {e}")
+        print(f"TTS error ({speech_synthesizer.name}): {e}")
         return None
 
 
-app = FastAPI()
+def preload_provider(name, provider):
+    try:
+        started = time.perf_counter()
+        instance = provider.get()
+        # A first inference pulls local model weights into memory and sets up kernels
+        if hasattr(instance, "warmup"):
+            instance.warmup()
+        print(f"Preloaded {name} provider ({provider.name}) in {time.perf_counter() - started:.1f}s")
+    except Exception as e:
+        print(f"Could not preload {name} provider ({provider.name}): {e}")
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
 
-@app.post("/api/chat")
-def chat_endpoint(message: str = Form(...), history: str = Form(None), generate_audio: str = Form("false"), lang: str = Form("en")):
-    import json
-    # Parse and validate history
-    history_obj = None
-    if history:
-        try:
-            history_obj = json.loads(history)
-            if not isinstance(history_obj, list):
-                history_obj = []
-        except (json.JSONDecodeError, TypeError):
-            history_obj = []
-    else:
-        history_obj = []
+def log_retriever_load(future):
+    # Retrieving the exception also keeps asyncio from warning that it was never read
+    if not future.cancelled() and future.exception() is not None:
+        print(f"Retrieval engine failed to load; chat requests will fail until /api/reload-index succeeds: {future.exception()}")
 
-    # Translation pipeline
+
+@asynccontextmanager
+async def lifespan(app):
+    # Warm the retrieval engine in the background so /api/ready can report progress
+    retriever = RAG.get_retriever()
+    loop = asyncio.get_running_loop()
+    app.state.retriever_load = loop.run_in_executor(None, retriever.load)
+    app.state.retriever_load.add_done_callback(log_retriever_load)
+
+    global ollama_client, ollama_slots
+    ollama_client = httpx.AsyncClient(
+        base_url=API_LINK,
+        timeout=httpx.Timeout(OLLAMA_READ_TIMEOUT, connect=OLLAMA_CONNECT_TIMEOUT),
+        limits=httpx.Limits(max_connections=OLLAMA_MAX_CONNECTIONS, max_keepalive_connections=OLLAMA_MAX_CONNECTIONS),
+    )
+    ollama_slots = asyncio.Semaphore(OLLAMA_MAX_CONCURRENCY)
+    # spawn, not fork: forking a process that holds gRPC/torch threads is unsafe
+    global audio_pool
+    audio_pool = ProcessPoolExecutor(max_workers=AUDIO_DECODE_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    preload = {"stt": speech_recognizer, "tts": speech_synthesizer, "translation": translator.backend}
+    names = PRELOAD_PROVIDERS
+    if names == ["local"]:
+        names = [name for name, provider in preload.items() if provider.local]
+    for name in names:
+        if name not in preload:
+            raise ValueError(f"Unknown provider in PRELOAD_PROVIDERS: {name}")
+        loop.run_in_executor(None, preload_provider, name, preload[name])
+    try:
+        yield
+    finally:
+        await ollama_client.aclose()
+        audio_pool.shutdown(wait=False, cancel_futures=True)
+
+
+def parse_history(history):
+    """Parse and validate the history form field"""
+    if not history:
+        return []
+    try:
+        history_obj = json.loads(history)
+    except (json.JSONDecodeError, TypeError):
+        return []
+    return history_obj if isinstance(history_obj, list) else []
+
+def open_session(session_id, history):
+    """Find the conversation a request belongs to.
+
+    Returns (session_id, history_obj, server_side). A known session_id uses the
+    history kept on the server. Otherwise a new session is started from the
+    history field that older clients still send; server_side stays True when the
+    client asked for a session that has expired, so it adopts the new id.
+    """
+    if session_id:
+        stored = sessions.get(session_id)
+        if stored is not None:
+            return session_id, stored, True
+    history_obj = parse_history(history)
+    return sessions.create(history_obj), history_obj, bool(session_id)
+
+def turn_payload(session_id, server_side, updated_history, assistant_reply):
+    # Session clients only need the new reply; older clients get the full history back
+    if server_side:
+        return {"session_id": session_id, "reply": assistant_reply}
+    return {"session_id": session_id, "history": updated_history}
+
+async def translate_input(message, lang):
+    """Translate Gujarati user input to English for the model"""
     if lang == "gu":
-        # Translate Gujarati user input to English
-        translation = translate_client.translate(message, source_language="gu", target_language="en")
-        message_for_model = translation["translatedText"]
-    else:
-        message_for_model = message
+        with metrics.span("translate_in"):
+            return await run_in_threadpool(translator.translate, message, "gu", "en")
+    return message
+
+async def translate_output(text, lang):
+    """Translate a model reply back to Gujarati if needed"""
+    if lang == "gu" and text:
+        with metrics.span("translate_out"):
+            return await run_in_threadpool(translator.translate, text, "en", "gu")
+    return text
 
-    updated_history = chat_with_ollama(message_for_model, history_obj)
+async def reply_response(session_id, server_side, history_obj, updated_history, lang, generate_audio):
+    # The session keeps the English turns the model works with
+    sessions.save(session_id, updated_history)
     # Get the last assistant reply
     assistant_reply = None
-    if isinstance(updated_history, list) and len(updated_history) > 0:
+    if isinstance(updated_history, list) and len(updated_history) > len(history_obj):
         for entry in reversed(updated_history):
             if isinstance(entry, dict) and entry.get("role") == "assistant":
                 assistant_reply = entry.get("content")
                 break
     # Translate model reply back to Gujarati if needed
     if lang == "gu" and assistant_reply:
-        translation = translate_client.translate(assistant_reply, source_language="en", target_language="gu")
-        assistant_reply_gu = translation["translatedText"]
+        assistant_reply_gu = await translate_output(assistant_reply, lang)
         # Update the last assistant reply in history
         for entry in reversed(updated_history):
             if isinstance(entry, dict) and entry.get("role") == "assistant":
@@ -222,135 +315,314 @@ def chat_endpoint(message: str = Form(...), history: str = Form(None), generate_
         assistant_reply = assistant_reply_gu
     audio_url = None
     if generate_audio.lower() == "true" and assistant_reply:
-        tts_filename = generate_google_tts(assistant_reply)
-        if tts_filename and os.path.exists(tts_filename):
-            audio_url = f"/api/audio/{tts_filename}"
+        audio_url = await tts_audio_url(assistant_reply)
+    payload = turn_payload(session_id, server_side, updated_history, assistant_reply)
     if audio_url:
-        return JSONResponse({"history": updated_history, "audio_url": audio_url})
+        payload["audio_url"] = audio_url
+    return JSONResponse(payload)
+
+async def tts_audio_url(text):
+    with metrics.span("tts"):
+        tts_filename = await run_in_threadpool(generate_tts, text)
+    if tts_filename:
+        return f"/api/audio/{tts_filename}"
+    return None
+
+async def transcribe_upload(audio_bytes, lang):
+    """Decode an uploaded recording and transcribe it.
+
+    Returns (text, error_response); error_response is set when the audio could not be processed.
+    """
+    # Check if audio data is valid
+    if len(audio_bytes) == 0:
+        return None, JSONResponse({"error": "No audio data received"}, status_code=400)
+
+    print(f"Audio file size: {len(audio_bytes)} bytes")
+
+    loop = asyncio.get_running_loop()
+    try:
+        # ffmpeg decoding is CPU-heavy, so it runs in the process pool, not on the event loop
+        with metrics.span("audio_decode"):
+            content = await loop.run_in_executor(audio_pool, audio_processing.decode_to_linear16, audio_bytes)
+        sample_rate = audio_processing.SAMPLE_RATE_HERTZ
+        print("Audio conversion successful")
+    except Exception as e:
+        print(f"Audio conversion error: {e}")
+        # Try alternative approach - send the upload as-is and let Google read the wav header
+        content, sample_rate = audio_bytes, None
+
+    if lang == "gu":
+        language_code = "gu-IN"
     else:
-        return JSONResponse({"history": updated_history})
+        language_code = "en-US"
+    with metrics.span("stt"):
+        text = await run_in_threadpool(
+            transcribe_audio, content, language_code=language_code, sample_rate_hertz=sample_rate
+        )
+    return text, None
+
+def ndjson_event(event):
+    return json.dumps(event, ensure_ascii=False) + "\n"
+
+async def stream_chat_events(message_for_model, session_id, server_side, history_obj, lang, generate_audio, audio_mode="full"):
+    """Forward the reply as NDJSON events while Ollama generates it.
+
+    Emits {"type": "delta"} events with reply text, then one {"type": "done"}
+    event carrying the session id and the reply (or, for clients that send
+    their own history, the updated history) plus audio_url when requested. In
+    Gujarati mode each sentence is translated as soon as it is complete, so
+    deltas arrive a sentence at a time.
+
+    With audio_mode="sentences" every sentence is also synthesized as soon as
+    it is complete, several at once, and {"type": "audio"} events are emitted
+    in reply order, so playback can start after the first sentence. The done
+    event then carries the whole playlist.
+    """
+    want_audio = generate_audio.lower() == "true"
+    per_sentence_audio = want_audio and audio_mode == "sentences"
+    # Sentences are only needed when each one is translated or spoken on its own
+    by_sentence = lang == "gu" or per_sentence_audio
+    reply_parts = []
+    shown_parts = []
+    playlist = []
+    pending = []  # one task per sentence, in reply order
+    sentences = SentenceBuffer()
+    tts_slots = asyncio.Semaphore(TTS_SENTENCE_CONCURRENCY)
+
+    async def process_sentence(separator, sentence):
+        shown = await translate_output(sentence, lang)
+        audio_url = None
+        if per_sentence_audio:
+            async with tts_slots:
+                audio_url = await tts_audio_url(shown)
+        return separator, shown, audio_url
+
+    def start(sentence_list):
+        for separator, sentence in sentence_list:
+            pending.append(asyncio.create_task(process_sentence(separator, sentence)))
+
+    def sentence_events(separator, shown, audio_url):
+        if lang == "gu":
+            # Same layout as translate_output gives /api/chat: line breaks kept, otherwise one space
+            breaks = line_breaks(separator)
+            content = ((breaks or " ") if shown_parts else breaks) + shown
+            shown_parts.append(content)
+            yield ndjson_event({"type": "delta", "content": content})
+        if audio_url:
+            yield ndjson_event({"type": "audio", "index": len(playlist), "url": audio_url, "text": shown})
+            playlist.append(audio_url)
+
+    try:
+        async for token in stream_ollama(message_for_model, history_obj):
+            reply_parts.append(token)
+            if lang != "gu":
+                shown_parts.append(token)
+                yield ndjson_event({"type": "delta", "content": token})
+            if by_sentence:
+                start(sentences.feed(token))
+                # Emit finished sentences without waiting, keeping reply order
+                while pending and pending[0].done():
+                    for event in sentence_events(*pending.pop(0).result()):
+                        yield event
+        if by_sentence:
+            start(sentences.flush())
+            while pending:
+                for event in sentence_events(*await pending.pop(0)):
+                    yield event
+            reply = "".join(reply_parts)
+            breaks = line_breaks(reply[len(reply.rstrip()):])
+            if lang == "gu" and breaks and shown_parts:
+                shown_parts.append(breaks)
+                yield ndjson_event({"type": "delta", "content": breaks})
+    except Exception as e:
+        print(f"Local API request error: {e}")
+        error = turn_payload(session_id, server_side, history_obj, None)
+        yield ndjson_event({"type": "error", "error": f"Chat failed: {str(e)}", **error})
+        return
+    finally:
+        for task in pending:
+            task.cancel()
+
+    user_turn = {"role": "user", "content": message_for_model}
+    sessions.save(session_id, history_obj + [user_turn, {"role": "assistant", "content": "".join(reply_parts)}])
+    assistant_reply = "".join(shown_parts)
+    updated_history = history_obj + [user_turn, {"role": "assistant", "content": assistant_reply}]
+    done = {"type": "done", **turn_payload(session_id, server_side, updated_history, assistant_reply)}
+    if per_sentence_audio:
+        done["playlist"] = playlist
+    elif want_audio and assistant_reply:
+        audio_url = await tts_audio_url(assistant_reply)
+        if audio_url:
+            done["audio_url"] = audio_url
+    yield ndjson_event(done)
+
+def streaming_reply(events):
+    # X-Accel-Buffering stops reverse proxies from holding back the stream
+    return StreamingResponse(
+        events,
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+app = FastAPI(lifespan=lifespan)
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Debug-Trace"],
+)
+# Added last so it wraps CORS too and times the whole request
+app.add_middleware(metrics.TimingMiddleware)
+
+@app.post("/api/chat")
+async def chat_endpoint(message: str = Form(...), history: str = Form(None), generate_audio: str = Form("false"), lang: str = Form("en"), session_id: str = Form(None)):
+    """Send session_id to keep the conversation on the server; history is only for older clients"""
+    session_id, history_obj, server_side = open_session(session_id, history)
+    # Translation pipeline
+    message_for_model = await translate_input(message, lang)
+    updated_history = await chat_with_ollama(message_for_model, history_obj)
+    return await reply_response(session_id, server_side, history_obj, updated_history, lang, generate_audio)
+
+@app.post("/api/chat/stream")
+async def chat_stream_endpoint(message: str = Form(...), history: str = Form(None), generate_audio: str = Form("false"), lang: str = Form("en"), audio_mode: str = Form("full"), session_id: str = Form(None)):
+    """Same as /api/chat, but streams the reply as NDJSON events
+
+    audio_mode="sentences" streams one audio clip per sentence instead of a single clip at the end.
+    """
+    session_id, history_obj, server_side = open_session(session_id, history)
+    message_for_model = await translate_input(message, lang)
+    return streaming_reply(stream_chat_events(message_for_model, session_id, server_side, history_obj, lang, generate_audio, audio_mode))
 
 @app.post("/api/audio-chat")
-def audio_chat_endpoint(audio: UploadFile = File(...), history: str = Form(None), generate_audio: str = Form("false"), lang: str = Form("en")):
-    import json
+async def audio_chat_endpoint(audio: UploadFile = File(...), history: str = Form(None), generate_audio: str = Form("false"), lang: str = Form("en"), session_id: str = Form(None)):
     try:
-        # Parse and validate history
-        history_obj = None
-        if history:
-            try:
-                history_obj = json.loads(history)
-                if not isinstance(history_obj, list):
-                    history_obj = []
-            except (json.JSONDecodeError, TypeError):
-                history_obj = []
-        else:
-            history_obj = []
-            
-        audio_bytes = audio.file.read()
-        
-        # Check if audio data is valid
-        if len(audio_bytes) == 0:
-            return JSONResponse({"error": "No audio data received"}, status_code=400)
-        
-        # Save the uploaded file as webm
-        with open("temp_audio.webm", "wb") as f:
-            f.write(audio_bytes)
-        
-        print(f"Audio file size: {len(audio_bytes)} bytes")
-        
-        # Check if file was saved properly
-        if not os.path.exists("temp_audio.webm") or os.path.getsize("temp_audio.webm") == 0:
-            return JSONResponse({"error": "Failed to save audio file"}, status_code=500)
-        
-        try:
-            # Try to convert webm to wav
-            sound = AudioSegment.from_file("temp_audio.webm")
-            sound.export("temp_audio.wav", format="wav", parameters=["-acodec", "pcm_s16le"])
-            print("Audio conversion successful")
-        except Exception as e:
-            print(f"Audio conversion error: {e}")
-            # Try alternative approach - save as wav directly
-            try:
-                with open("temp_audio.wav", "wb") as f:
-                    f.write(audio_bytes)
-                print("Saved audio as wav directly")
-            except Exception as e2:
-                print(f"Direct wav save failed: {e2}")
-                return JSONResponse({"error": f"Audio conversion failed: {str(e)}"}, status_code=500)
-        
-        if lang == "gu":
-            language_code = "gu-IN"
-        else:
-            language_code = "en-US"
-        gujarati_text = transcribe_audio_with_google("temp_audio.wav", language_code=language_code)
+        session_id, history_obj, server_side = open_session(session_id, history)
+        gujarati_text, error_response = await transcribe_upload(await audio.read(), lang)
+        if error_response:
+            return error_response
         if not gujarati_text:
             print("No text transcribed from audio")
-            return JSONResponse({"history": history_obj})
+            return JSONResponse(turn_payload(session_id, server_side, history_obj, None))
         # Translation pipeline
-        if lang == "gu":
-            # Translate Gujarati user input to English
-            translation = translate_client.translate(gujarati_text, source_language="gu", target_language="en")
-            message_for_model = translation["translatedText"]
-        else:
-            message_for_model = gujarati_text
-        updated_history = chat_with_ollama(message_for_model, history_obj)
-        # Get the last assistant reply
-        assistant_reply = None
-        if isinstance(updated_history, list) and len(updated_history) > 0:
-            for entry in reversed(updated_history):
-                if isinstance(entry, dict) and entry.get("role") == "assistant":
-                    assistant_reply = entry.get("content")
-                    break
-        # Translate model reply back to Gujarati if needed
-        if lang == "gu" and assistant_reply:
-            translation = translate_client.translate(assistant_reply, source_language="en", target_language="gu")
-            assistant_reply_gu = translation["translatedText"]
-            # Update the last assistant reply in history
-            for entry in reversed(updated_history):
-                if isinstance(entry, dict) and entry.get("role") == "assistant":
-                    entry["content"] = assistant_reply_gu
-                    break
-            assistant_reply = assistant_reply_gu
-        audio_url = None
-        if generate_audio.lower() == "true" and assistant_reply:
-            tts_filename = generate_google_tts(assistant_reply)
-            if tts_filename and os.path.exists(tts_filename):
-                audio_url = f"/api/audio/{tts_filename}"
-        if audio_url:
-            return JSONResponse({"history": updated_history, "audio_url": audio_url})
-        else:
-            return JSONResponse({"history": updated_history})
-        
+        message_for_model = await translate_input(gujarati_text, lang)
+        updated_history = await chat_with_ollama(message_for_model, history_obj)
+        return await reply_response(session_id, server_side, history_obj, updated_history, lang, generate_audio)
+
     except Exception as e:
         print(f"Audio chat endpoint error: {e}")
         return JSONResponse({"error": f"Audio processing failed: {str(e)}"}, status_code=500)
 
+@app.post("/api/audio-chat/stream")
+async def audio_chat_stream_endpoint(audio: UploadFile = File(...), history: str = Form(None), generate_audio: str = Form("false"), lang: str = Form("en"), audio_mode: str = Form("full"), session_id: str = Form(None)):
+    """Same as /api/audio-chat, but streams the transcript and reply as NDJSON events"""
+    try:
+        session_id, history_obj, server_side = open_session(session_id, history)
+        gujarati_text, error_response = await transcribe_upload(await audio.read(), lang)
+        if error_response:
+            return error_response
+        if not gujarati_text:
+            print("No text transcribed from audio")
+            done = {"type": "done", **turn_payload(session_id, server_side, history_obj, None)}
+            return streaming_reply(iter([ndjson_event(done)]))
+        message_for_model = await translate_input(gujarati_text, lang)
+    except Exception as e:
+        print(f"Audio chat endpoint error: {e}")
+        return JSONResponse({"error": f"Audio processing failed: {str(e)}"}, status_code=500)
+
+    async def events():
+        yield ndjson_event({"type": "transcript", "content": gujarati_text})
+        async for event in stream_chat_events(message_for_model, session_id, server_side, history_obj, lang, generate_audio, audio_mode):
+            yield event
+    return streaming_reply(events())
+
+def audio_file_response(path, filename, request):
+    """Serve a cached audio file with ETag revalidation and single-range requests"""
+    # Cache filenames are content hashes, so the name doubles as a strong ETag
+    etag = '"' + filename.rsplit(".", 1)[0] + '"'
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "public, max-age=31536000, immutable",
+    }
+    if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    size = os.path.getsize(path)
+    range_header = request.headers.get("range")
+    if not range_header:
+        return FileResponse(path=path, media_type=tts_cache_module.media_type(filename), headers=headers)
+
+    match = re.fullmatch(r"bytes=(\d*)-(\d*)", range_header.strip())
+    if not match or match.groups() == ("", ""):
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+    first, last = match.groups()
+    if first:
+        start, end = int(first), min(int(last), size - 1) if last else size - 1
+    else:
+        # Suffix range: the last N bytes
+        start, end = max(0, size - int(last)), size - 1
+    if start >= size or start > end:
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+    with open(path, "rb") as f:
+        f.seek(start)
+        content = f.read(end - start + 1)
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return Response(content=content, status_code=206, media_type=tts_cache_module.media_type(filename), headers=headers)
+
 @app.get("/api/audio/{filename}")
-def get_audio_file(filename: str):
+def get_audio_file(filename: str, request: Request):
     """Serve generated audio files"""
-    if os.path.exists(filename):
-        return FileResponse(
-            path=filename,
-            media_type="audio/wav",
-            filename=filename
-        )
+    path = tts_cache.lookup(filename)
+    if path:
+        return audio_file_response(path, filename, request)
     else:
         return JSONResponse({"error": "Audio file not found"}, status_code=404)
 
+@app.get("/api/cache-stats")
+def cache_stats_endpoint():
+    """Hit/miss counters for the server-side caches"""
+    return JSONResponse({"tts": tts_cache.stats(), "translation": translator.stats(), "answers": answer_cache.stats()})
+
+@app.get("/metrics")
+def metrics_endpoint():
+    """Per-stage and per-route latency histograms in the Prometheus text format"""
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/ready")
+def ready_endpoint():
+    """Report whether the retrieval engine is warm"""
+    status = RAG.get_retriever().status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+@app.post("/api/reload-index")
+def reload_index_endpoint():
+    """Swap in the index after `python build_index.py` has updated it"""
+    try:
+        RAG.get_retriever().reload()
+        return JSONResponse(RAG.get_retriever().status())
+    except Exception as e:
+        return JSONResponse({"error": f"Index reload failed: {str(e)}"}, status_code=500)
+
 @app.post("/api/clear")
-def clear_endpoint():
+def clear_endpoint(session_id: str = Form(None)):
+    if session_id:
+        sessions.drop(session_id)
     return JSONResponse({"history": []})
 
 @app.post("/api/google-tts")
 def google_tts_endpoint(text: str = Form(...)):
     """Generate high-quality Gujarati speech using Google Cloud TTS"""
     try:
-        output_filename = generate_google_tts(text)
-        if output_filename and os.path.exists(output_filename):
+        output_filename = generate_tts(text)
+        if output_filename and tts_cache.lookup(output_filename):
             return FileResponse(
-                path=output_filename,
-                media_type="audio/mp3",
-                filename="gujarati_speech.mp3"
+                path=tts_cache.path(output_filename),
+                media_type=tts_cache_module.media_type(output_filename),
+                filename="gujarati_speech." + output_filename.rsplit(".", 1)[-1]
             )
         else:
             return JSONResponse({"error": "Failed to generate audio"}, status_code=500)
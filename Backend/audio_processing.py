@@ -0,0 +1,17 @@
+import io
+
+# Speech-to-Text gets mono 16-bit PCM (LINEAR16) at this rate
+SAMPLE_RATE_HERTZ = 16000
+
+
+def decode_to_linear16(audio_bytes, sample_rate=SAMPLE_RATE_HERTZ):
+    """Decode an uploaded recording (webm/opus, mp4, wav...) to raw LINEAR16 PCM.
+
+    Runs in a worker process. pydub hands ffmpeg a private temporary file that
+    is removed once decoding finishes, so concurrent uploads never share a path.
+    """
+    # Imported here so only the worker processes load pydub
+    from pydub import AudioSegment
+    sound = AudioSegment.from_file(io.BytesIO(audio_bytes))
+    sound = sound.set_channels(1).set_frame_rate(sample_rate).set_sample_width(2)
+    return sound.raw_data
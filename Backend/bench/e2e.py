@@ -0,0 +1,177 @@
+"""End-to-end load test of /api/chat and /api/audio-chat with local stand-ins.
+
+Starts the fake Ollama server and the app (with stub STT, translation and
+TTS providers) in subprocesses, waits for the retrieval engine to be warm,
+then replays a fixed corpus of text questions and audio clips at each
+concurrency level. Run from the Backend directory after building the index:
+
+    python build_index.py
+    python -m bench.e2e --concurrency 1 8 32 --requests 100 --json e2e.json
+    python -m bench.e2e --endpoints chat --stream --token-delay 0.05 --stub-delay 0.2
+
+Reports p50/p95/p99 latency, throughput and the server's resident memory
+after each level (and its peak). Keep the --json output of two versions to
+compare them; the config block records the settings the numbers came from.
+"""
+import argparse
+import asyncio
+import io
+import json
+import math
+import os
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+
+from bench.load_test import print_failures, run_level
+from bench.startup import free_port, wait_for
+
+QUERIES = [
+    ("I have had a mild fever since yesterday, what should I do?", "en"),
+    ("My child has loose motions since morning.", "en"),
+    ("What is MA Yojana and how do I apply?", "en"),
+    ("How can I tell if it is dengue?", "en"),
+    ("મને બે દિવસથી માથું દુખે છે.", "gu"),
+    ("ડાયાબિટીસમાં શું ખાવું જોઈએ?", "gu"),
+]
+AUDIO_SECONDS = [1.5, 3.0, 6.0]  # clip lengths in the audio corpus
+ENDPOINTS = {"chat": "/api/chat", "audio-chat": "/api/audio-chat"}
+
+
+def tone_wav(seconds, sample_rate=16000, frequency=220.0):
+    """A quiet sine tone as a 16-bit mono wav, standing in for a recorded question."""
+    frames = b"".join(
+        struct.pack("<h", int(3000 * math.sin(2 * math.pi * frequency * i / sample_rate)))
+        for i in range(int(seconds * sample_rate))
+    )
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as out:
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(sample_rate)
+        out.writeframes(frames)
+    return buffer.getvalue()
+
+
+def build_corpus(endpoint, generate_audio):
+    audio = "true" if generate_audio else "false"
+    if endpoint == "chat":
+        return [({"message": message, "lang": lang, "generate_audio": audio}, None) for message, lang in QUERIES]
+    clips = [tone_wav(seconds) for seconds in AUDIO_SECONDS]
+    return [
+        ({"lang": lang, "generate_audio": audio}, {"audio": ("question.wav", clip, "audio/wav")})
+        for clip in clips
+        for lang in ("gu", "en")
+    ]
+
+
+def memory_mb(pid):
+    """Current and peak resident memory of a process, from /proc (Linux only)."""
+    values = {}
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                key, _, rest = line.partition(":")
+                if key in ("VmRSS", "VmHWM"):
+                    values[key] = int(rest.split()[0]) / 1024
+    except OSError:
+        pass
+    return values.get("VmRSS"), values.get("VmHWM")
+
+
+def start_processes(args, workdir):
+    ollama_port, app_port = free_port(), free_port()
+    fake = subprocess.Popen(
+        [sys.executable, "-m", "bench.fake_ollama", "--port", str(ollama_port), "--tokens", str(args.tokens),
+         "--token-delay", str(args.token_delay), "--first-token-delay", str(args.first_token_delay),
+         "--parallel", str(args.parallel)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    env = {
+        **os.environ,
+        "OLLAMA_API_LINK": f"http://127.0.0.1:{ollama_port}",
+        "STT_PROVIDER": "stub",
+        "TTS_PROVIDER": "stub",
+        "TRANSLATION_PROVIDER": "stub",
+        "STUB_PROVIDER_DELAY": str(args.stub_delay),
+        "PRELOAD_PROVIDERS": "",
+        # Fresh caches, so every run starts equally cold
+        "TTS_CACHE_DIR": os.path.join(workdir, "tts_cache"),
+        "TRANSLATION_CACHE_PATH": os.path.join(workdir, "translation_cache.sqlite3"),
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--port", str(app_port), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL if not args.server_logs else None, stderr=subprocess.STDOUT,
+    )
+    return fake, server, f"http://127.0.0.1:{app_port}"
+
+
+async def run_endpoints(args, url, server_pid):
+    results = []
+    for name in args.endpoints:
+        endpoint = ENDPOINTS[name] + ("/stream" if args.stream else "")
+        corpus = build_corpus(name, args.generate_audio)
+        for concurrency in args.concurrency:
+            total = max(args.requests, concurrency)
+            result = await run_level(url, endpoint, concurrency, total, None, args.stream, args.timeout, corpus)
+            result["rss_mb"], result["peak_rss_mb"] = memory_mb(server_pid)
+            results.append(result)
+    return results
+
+
+def print_table(results):
+    fmt = lambda v, w=8: f"{v:{w}.3f}" if v is not None else f"{'-':>{w}}"
+    print(f"{'endpoint':<24} {'conc':>5} {'ok':>6} {'err':>5} {'req/s':>8} {'p50 s':>8} {'p95 s':>8} {'p99 s':>8} {'rss MB':>8} {'peak MB':>8}")
+    for r in results:
+        mem = lambda v: f"{v:8.1f}" if v is not None else f"{'-':>8}"
+        print(
+            f"{r['endpoint']:<24} {r['concurrency']:>5} {r['requests'] - r['errors']:>6} {r['errors']:>5} "
+            f"{r['throughput_rps']:8.2f} {fmt(r['latency_p50'])} {fmt(r['latency_p95'])} {fmt(r['latency_p99'])} "
+            f"{mem(r['rss_mb'])} {mem(r['peak_rss_mb'])}"
+        )
+    print_failures(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end load test of the Nidaan AI backend with local stand-ins")
+    parser.add_argument("--endpoints", nargs="+", default=list(ENDPOINTS), choices=list(ENDPOINTS))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=100, help="Requests per concurrency level")
+    parser.add_argument("--stream", action="store_true", help="Use the /stream variants of the endpoints")
+    parser.add_argument("--generate-audio", action="store_true", help="Ask for a spoken reply (stub TTS)")
+    parser.add_argument("--tokens", type=int, default=150, help="Tokens per fake model reply")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="Seconds between fake model tokens")
+    parser.add_argument("--first-token-delay", type=float, default=0.2, help="Seconds before the first fake token")
+    parser.add_argument("--parallel", type=int, default=0, help="Fake model generation slots, 0 for unlimited")
+    parser.add_argument("--stub-delay", type=float, default=0.1, help="Seconds per stub STT/translation/TTS call")
+    parser.add_argument("--ready-timeout", type=float, default=300.0, help="Seconds to wait for the retrieval engine")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Per-request timeout")
+    parser.add_argument("--server-logs", action="store_true", help="Show the app's output")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="nidaan-bench-") as workdir:
+        fake, server, url = start_processes(args, workdir)
+        try:
+            started = time.perf_counter()
+            if wait_for(f"{url}/api/ready", started, args.ready_timeout) is None:
+                sys.exit("Server did not become ready; is the index built (python build_index.py)?")
+            results = asyncio.run(run_endpoints(args, url, server.pid))
+        finally:
+            server.terminate()
+            fake.terminate()
+            server.wait()
+            fake.wait()
+
+    print_table(results)
+    if args.json:
+        config = {k: v for k, v in vars(args).items() if k not in ("json", "server_logs")}
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"config": config, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""A stand-in for Ollama's /api/chat that streams NDJSON at a fixed token rate.
+
+    python -m bench.fake_ollama --port 11435 --tokens 150 --token-delay 0.02 --parallel 4
+
+--parallel mimics OLLAMA_NUM_PARALLEL: extra generations wait for a free slot.
+"""
+import argparse
+import asyncio
+import json
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+import uvicorn
+
+REPLY = (
+    "A mild fever after a long day in the fields is often seasonal fever or tiredness. "
+    "Watch for a fever above 102 degrees, stiff neck or rashes. "
+    "Drink plenty of clean water, rest in the shade and try warm haldi milk at night. "
+    "If the fever lasts more than two days, please visit the PHC or call your ASHA worker. "
+    "This is general information. If your symptoms worsen or do not improve, please visit a doctor or your nearest PHC."
+)
+WORDS = REPLY.split(" ")
+
+
+def create_app(tokens=150, token_delay=0.02, first_token_delay=0.2, parallel=0):
+    app = FastAPI()
+    slots = asyncio.Semaphore(parallel) if parallel > 0 else None
+
+    async def generate(model):
+        await asyncio.sleep(first_token_delay)
+        for i in range(tokens):
+            word = WORDS[i % len(WORDS)]
+            chunk = {"model": model, "message": {"role": "assistant", "content": word + " "}, "done": False}
+            yield json.dumps(chunk) + "\n"
+            await asyncio.sleep(token_delay)
+        yield json.dumps({"model": model, "message": {"role": "assistant", "content": ""}, "done": True}) + "\n"
+
+    async def limited(model):
+        async with slots:
+            async for line in generate(model):
+                yield line
+
+    @app.post("/api/chat")
+    async def chat(request: Request):
+        body = await request.json()
+        model = body.get("model", "fake")
+        stream = limited(model) if slots else generate(model)
+        return StreamingResponse(stream, media_type="application/x-ndjson")
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Ollama server for load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--tokens", type=int, default=150, help="Tokens per reply")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="Seconds between tokens")
+    parser.add_argument("--first-token-delay", type=float, default=0.2, help="Seconds before the first token (prefill)")
+    parser.add_argument("--parallel", type=int, default=0, help="Concurrent generations, 0 for unlimited")
+    args = parser.parse_args()
+
+    app = create_app(args.tokens, args.token_delay, args.first_token_delay, args.parallel)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""Measure /api/chat throughput and latency at increasing concurrency.
+
+Start the fake model backend and the server pointed at it, then run the load:
+
+    python -m bench.fake_ollama --port 11435 &
+    OLLAMA_API_LINK=http://127.0.0.1:11435 uvicorn app:app --port 8000 &
+    python -m bench.load_test --url http://127.0.0.1:8000 --concurrency 1 8 32 128
+
+To compare before/after, serve each build with bench.serve_version (it
+also runs builds that predate OLLAMA_API_LINK), run the same command
+against each and keep the --json output of both. Raise
+OLLAMA_MAX_CONCURRENCY and OLLAMA_MAX_CONNECTIONS to the highest
+concurrency level when measuring the server rather than its caps.
+"""
+import argparse
+import asyncio
+import json
+import time
+from collections import Counter
+
+import httpx
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[rank]
+
+
+class FailedReply(Exception):
+    """The server answered 2xx but produced no reply (the chat endpoints report model errors this way)."""
+
+
+def has_reply(payload):
+    # Session clients get "reply"; clients that send their own history get it back with the new assistant turn
+    if payload.get("reply"):
+        return True
+    history = payload.get("history")
+    return bool(history) and history[-1].get("role") == "assistant" and bool(history[-1].get("content"))
+
+
+def check_reply(payload):
+    if "error" in payload:
+        raise FailedReply("error in response")
+    if not has_reply(payload):
+        raise FailedReply("no assistant reply")
+
+
+def check_events(events):
+    if any(event.get("type") == "error" for event in events):
+        raise FailedReply("error event")
+    done = [event for event in events if event.get("type") == "done"]
+    if not done:
+        raise FailedReply("no done event")
+    if not has_reply(done[-1]):
+        raise FailedReply("no assistant reply")
+
+
+async def one_request(client, endpoint, form, stream, files=None):
+    started = time.perf_counter()
+    first_byte = None
+    if stream:
+        events = []
+        async with client.stream("POST", endpoint, data=form, files=files) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if first_byte is None:
+                    first_byte = time.perf_counter() - started
+                if line.strip():
+                    events.append(json.loads(line))
+        check_events(events)
+    else:
+        response = await client.post(endpoint, data=form, files=files)
+        response.raise_for_status()
+        first_byte = time.perf_counter() - started
+        check_reply(response.json())
+    return time.perf_counter() - started, first_byte
+
+
+def failure_reason(error):
+    if isinstance(error, FailedReply):
+        return str(error)
+    if isinstance(error, httpx.HTTPStatusError):
+        return f"HTTP {error.response.status_code}"
+    return type(error).__name__
+
+
+async def run_level(url, endpoint, concurrency, total, form, stream, timeout, corpus=None):
+    """Send total requests with concurrency in flight.
+
+    corpus, if given, is a list of (form, files) pairs used in turn instead
+    of sending the same form every time.
+    """
+    corpus = corpus or [(form, None)]
+    latencies, first_bytes, failures = [], [], Counter()
+    remaining = iter(range(total))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits) as client:
+        async def worker():
+            for i in remaining:
+                request_form, files = corpus[i % len(corpus)]
+                try:
+                    latency, first_byte = await one_request(client, endpoint, request_form, stream, files)
+                    latencies.append(latency)
+                    first_bytes.append(first_byte)
+                except Exception as e:
+                    failures[failure_reason(e)] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "endpoint": endpoint,
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": sum(failures.values()),
+        "failures": dict(failures),
+        "seconds": elapsed,
+        "throughput_rps": len(latencies) / elapsed if elapsed else 0.0,
+        "latency_p50": percentile(latencies, 50),
+        "latency_p95": percentile(latencies, 95),
+        "latency_p99": percentile(latencies, 99),
+        "first_byte_p50": percentile(first_bytes, 50),
+    }
+
+
+def print_table(results):
+    print(f"{'conc':>5} {'ok':>6} {'err':>5} {'req/s':>8} {'p50 s':>8} {'p95 s':>8} {'p99 s':>8} {'ttfb p50':>9}")
+    for r in results:
+        fmt = lambda v: f"{v:8.3f}" if v is not None else f"{'-':>8}"
+        print(
+            f"{r['concurrency']:>5} {r['requests'] - r['errors']:>6} {r['errors']:>5} {r['throughput_rps']:8.2f} "
+            f"{fmt(r['latency_p50'])} {fmt(r['latency_p95'])} {fmt(r['latency_p99'])} {fmt(r['first_byte_p50']):>9}"
+        )
+    print_failures(results)
+
+
+def print_failures(results):
+    for r in results:
+        if r["failures"]:
+            reasons = ", ".join(f"{reason}: {count}" for reason, count in sorted(r["failures"].items()))
+            print(f"  {r['endpoint']} at concurrency {r['concurrency']} failed: {reasons}")
+
+
+async def run(args):
+    form = {"message": args.message, "lang": args.lang, "generate_audio": "false"}
+    endpoint = "/api/chat/stream" if args.stream else "/api/chat"
+    results = []
+    for concurrency in args.concurrency:
+        total = max(args.requests, concurrency)
+        results.append(await run_level(args.url, endpoint, concurrency, total, form, args.stream, args.timeout))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the Nidaan AI chat endpoint")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 128])
+    parser.add_argument("--requests", type=int, default=200, help="Requests per concurrency level")
+    parser.add_argument("--message", default="I have had a mild fever since yesterday, what should I do?")
+    parser.add_argument("--lang", default="en")
+    parser.add_argument("--stream", action="store_true", help="Use /api/chat/stream and record time to first byte")
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    print_table(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""Micro-benchmarks for the retrieval and prompt path, without a server.
+
+    python -m bench.micro --json micro.json
+    python -m bench.micro --only prompt bm25
+    VECTOR_BACKEND=numpy python -m bench.micro --only retrieve
+
+  retrieve       RAG.retrieve_context on the Chroma collection and the warm
+                 Retriever (hybrid/rerank as configured), per query
+  prepare_index  full and no-change incremental index builds of the knowledge
+                 file, into a scratch directory
+  bm25           BM25 search over the knowledge chunks, per query
+  prompt         prompting.build_chat_messages with a full session history
+
+Benchmarks that need something missing here (an index, the embedding model)
+are reported with their error instead of timings.
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import RAG
+import prompting
+from bm25 import BM25Index
+from bench.load_test import percentile
+from bench.retrieval_quality import QUERIES
+
+HISTORY = [
+    {"role": "user", "content": "I have had a mild fever since yesterday, what should I do?"},
+    {"role": "assistant", "content": "A mild fever is often seasonal. Drink plenty of clean water and rest. " * 6},
+] * 6
+
+
+def timed(fn, repeats):
+    latencies = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def summary(name, latencies, **extra):
+    return {
+        "benchmark": name,
+        "calls": len(latencies),
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "mean_ms": sum(latencies) / len(latencies) * 1000,
+        **extra,
+    }
+
+
+def per_query(fn, queries, repeats):
+    latencies = []
+    for _ in range(repeats):
+        for query in queries:
+            latencies.extend(timed(lambda: fn(query), 1))
+    return latencies
+
+
+def bench_retrieve(args, queries):
+    results = []
+    retriever = RAG.Retriever(os.path.abspath(RAG.KNOWLEDGE_PATH))
+    load = timed(retriever.load, 1)
+    results.append(summary("retriever.load", load))
+    # Warm the embedding model before timing queries
+    retriever.retrieve(queries[0], top_k=args.top_k)
+    results.append(summary(f"retriever.retrieve ({retriever.mode})",
+                           per_query(lambda q: retriever.retrieve(q, top_k=args.top_k), queries, args.repeats)))
+    if RAG.VECTOR_BACKEND == "chroma":
+        _, collection, _ = RAG.load_index()
+        results.append(summary("RAG.retrieve_context",
+                               per_query(lambda q: RAG.retrieve_context(q, collection, top_k=args.top_k), queries, args.repeats)))
+    return results
+
+
+def bench_prepare_index(args, queries):
+    text_path = os.path.abspath(RAG.KNOWLEDGE_PATH)
+    # Index paths are relative to the working directory, so build in a scratch copy
+    home = os.getcwd()
+    scratch = tempfile.mkdtemp(prefix="nidaan-index-")
+    try:
+        os.chdir(scratch)
+        shutil.copy(text_path, "knowledge.txt")
+        full = timed(lambda: RAG.build_index("knowledge.txt", full=True), 1)
+        incremental = timed(lambda: RAG.build_index("knowledge.txt"), args.repeats)
+    finally:
+        os.chdir(home)
+        shutil.rmtree(scratch, ignore_errors=True)
+    chunks = len(RAG.split_chunks(text_path))
+    return [
+        summary(f"build_index full ({RAG.VECTOR_BACKEND})", full, chunks=chunks),
+        summary(f"build_index unchanged ({RAG.VECTOR_BACKEND})", incremental, chunks=chunks),
+    ]
+
+
+def bench_bm25(args, queries):
+    chunks = sorted(RAG.split_chunks(RAG.KNOWLEDGE_PATH).items(), key=lambda item: item[1]["start_index"])
+    ids, documents = [chunk_id for chunk_id, _ in chunks], [c["text"] for _, c in chunks]
+    build = timed(lambda: BM25Index(ids, documents), args.repeats)
+    index = BM25Index(ids, documents)
+    search = per_query(lambda q: index.search(q, RAG.HYBRID_CANDIDATES), queries, args.repeats)
+    return [summary("BM25Index build", build, chunks=len(ids)), summary("BM25Index.search", search)]
+
+
+def bench_prompt(args, queries):
+    chunks = [c["text"] for c in RAG.split_chunks(RAG.KNOWLEDGE_PATH).values()][:args.top_k + 2]
+    latencies = per_query(
+        lambda q: prompting.build_chat_messages("You are NidaanAI. " * 40, HISTORY, q, chunks), queries, args.repeats
+    )
+    _, stats = prompting.build_chat_messages("You are NidaanAI. " * 40, HISTORY, queries[0], chunks)
+    return [summary("prompting.build_chat_messages", latencies, tokens=stats["total"])]
+
+
+BENCHMARKS = {"retrieve": bench_retrieve, "prepare_index": bench_prepare_index, "bm25": bench_bm25, "prompt": bench_prompt}
+
+
+def run(args):
+    queries = [query for query, _ in QUERIES]
+    results = []
+    for name in args.only or list(BENCHMARKS):
+        try:
+            results.extend(BENCHMARKS[name](args, queries))
+        except Exception as e:
+            results.append({"benchmark": name, "error": f"{type(e).__name__}: {e}"})
+    return results
+
+
+def print_table(results):
+    print(f"{'benchmark':<40} {'calls':>6} {'p50 ms':>10} {'p95 ms':>10} {'mean ms':>10}")
+    for r in results:
+        if "error" in r:
+            print(f"{r['benchmark']:<40} error: {r['error']}")
+            continue
+        print(f"{r['benchmark']:<40} {r['calls']:>6} {r['p50_ms']:10.3f} {r['p95_ms']:10.3f} {r['mean_ms']:10.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for retrieval, indexing and prompt building")
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), help="Run only these benchmarks")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    results = run(args)
+    print_table(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""Compare speech and translation providers: cloud round-trips against local models.
+
+    python -m bench.provider_latency --stt google whisper --tts google mms --translation google nllb
+    python -m bench.provider_latency --stt whisper --audio question1.webm question2.wav --json local.json
+
+Each provider is built and warmed up once (reported as load_s and warmup_s),
+then timed on a fixed corpus of short health questions and answers, one
+sentence per call as the streaming endpoints do. Without --audio, the sample
+clips for STT are synthesized from the Gujarati corpus with the first TTS
+provider that works. Providers that fail to load (missing credentials or
+packages) are reported with their error instead of timings.
+"""
+import argparse
+import json
+import time
+
+import audio_processing
+import providers
+from bench.load_test import percentile
+
+SENTENCES_GU = [
+    "મને બે દિવસથી તાવ છે.",
+    "મારા બાળકને ઝાડા થયા છે, શું કરવું?",
+    "મા યોજના કાર્ડ કેવી રીતે મળે?",
+    "ડાયાબિટીસમાં શું ખાવું જોઈએ?",
+]
+SENTENCES_EN = [
+    "Drink plenty of clean water and rest in the shade.",
+    "If the fever lasts more than two days, please visit the PHC.",
+    "Give your child ORS after every loose stool.",
+    "This is general information, please see a doctor if it gets worse.",
+]
+
+
+def time_calls(calls, repeats):
+    latencies = []
+    for _ in range(repeats):
+        for call in calls:
+            started = time.perf_counter()
+            call()
+            latencies.append(time.perf_counter() - started)
+    return {
+        "calls": len(latencies),
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "mean": sum(latencies) / len(latencies) if latencies else None,
+    }
+
+
+def load(create, name):
+    """Build and warm up a provider. Returns (provider, timings)."""
+    started = time.perf_counter()
+    provider = create(name)
+    loaded = time.perf_counter()
+    if hasattr(provider, "warmup"):
+        provider.warmup()
+    return provider, {"load_s": loaded - started, "warmup_s": time.perf_counter() - loaded}
+
+
+def bench_provider(stage, name, create, make_calls, repeats):
+    row = {"stage": stage, "provider": name}
+    try:
+        provider, timings = load(create, name)
+        row.update(timings)
+        row.update(time_calls(make_calls(provider), repeats))
+    except Exception as e:
+        row["error"] = f"{type(e).__name__}: {e}"
+        provider = None
+    return row, provider
+
+
+def sample_audio(paths, synthesizers):
+    """Return [(content, sample_rate_hertz)] for STT, decoded like uploads are."""
+    if paths:
+        recordings = []
+        for path in paths:
+            with open(path, "rb") as f:
+                recordings.append(f.read())
+    else:
+        # Prefer real speech; the stub's silent clips only exercise the code path
+        working = sorted((s for s in synthesizers if s is not None), key=lambda s: s.name == "stub")
+        if not working:
+            return []
+        # Synthesizers return MP3 or wav depending on the provider
+        recordings = [working[0].synthesize(text) for text in SENTENCES_GU]
+    rate = audio_processing.SAMPLE_RATE_HERTZ
+    return [(audio_processing.decode_to_linear16(recording), rate) for recording in recordings]
+
+
+def run(args):
+    results, synthesizers = [], []
+    for name in args.tts:
+        row, synthesizer = bench_provider(
+            "tts", name, providers.create_speech_synthesizer,
+            lambda p: [lambda text=text: p.synthesize(text) for text in SENTENCES_GU], args.repeats,
+        )
+        results.append(row)
+        synthesizers.append(synthesizer)
+
+    for name in args.translation:
+        row, _ = bench_provider(
+            "translation", name, providers.create_translation_backend,
+            lambda p: [lambda text=text: p.translate_batch([text], "gu", "en") for text in SENTENCES_GU]
+            + [lambda text=text: p.translate_batch([text], "en", "gu") for text in SENTENCES_EN],
+            args.repeats,
+        )
+        results.append(row)
+
+    clips = sample_audio(args.audio, synthesizers) if args.stt else []
+    for name in args.stt:
+        if not clips:
+            results.append({"stage": "stt", "provider": name, "error": "no sample audio (pass --audio or a working --tts)"})
+            continue
+        row, _ = bench_provider(
+            "stt", name, providers.create_speech_recognizer,
+            lambda p: [lambda clip=clip: p.transcribe(clip[0], "gu-IN", clip[1]) for clip in clips], args.repeats,
+        )
+        results.append(row)
+    return results
+
+
+def print_table(results):
+    fmt = lambda v: f"{v:9.3f}" if v is not None else f"{'-':>9}"
+    print(f"{'stage':<12} {'provider':<9} {'load s':>9} {'warmup s':>9} {'p50 s':>9} {'p95 s':>9} {'mean s':>9}")
+    for r in results:
+        if "error" in r:
+            print(f"{r['stage']:<12} {r['provider']:<9} error: {r['error']}")
+            continue
+        print(
+            f"{r['stage']:<12} {r['provider']:<9} {fmt(r['load_s'])} {fmt(r['warmup_s'])} "
+            f"{fmt(r['p50'])} {fmt(r['p95'])} {fmt(r['mean'])}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare local and cloud speech/translation provider latency")
+    parser.add_argument("--stt", nargs="*", default=["google", "whisper"], choices=sorted(providers.SPEECH_RECOGNIZERS))
+    parser.add_argument("--tts", nargs="*", default=["google", "mms"], choices=sorted(providers.SPEECH_SYNTHESIZERS))
+    parser.add_argument("--translation", nargs="*", default=["google", "nllb"], choices=sorted(providers.TRANSLATION_BACKENDS))
+    parser.add_argument("--audio", nargs="*", default=[], help="Recordings to transcribe (any format ffmpeg reads)")
+    parser.add_argument("--repeats", type=int, default=3, help="Passes over the corpus per provider")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    results = run(args)
+    print_table(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
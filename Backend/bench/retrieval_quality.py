@@ -0,0 +1,120 @@
+"""Offline retrieval quality and latency benchmark over a fixed query set.
+
+Compares dense (Chroma only), BM25 only, hybrid fusion and, with
+--rerank-model, hybrid plus cross-encoder reranking on the local index:
+
+    python build_index.py
+    python -m bench.retrieval_quality --top-k 3
+    VECTOR_BACKEND=numpy python -m bench.retrieval_quality
+    python -m bench.retrieval_quality --rerank-model cross-encoder/ms-marco-MiniLM-L-6-v2 --json retrieval.json
+
+A query counts as answered at rank r when the r-th chunk contains any of
+its expected phrases.
+"""
+import argparse
+import json
+import time
+
+import RAG
+from bench.load_test import percentile
+
+QUERIES = [
+    ("What is MA Yojana?", ["Amrutum"]),
+    ("How do I get help under Chiranjeevi Yojana for delivery?", ["Chiranjeevi"]),
+    ("What does Ayushman Bharat cover?", ["PM-JAY"]),
+    ("symptoms of dengue", ["Aedes"]),
+    ("How do I make ORS at home for diarrhea?", ["ORS"]),
+    ("Is turmeric milk good for cough?", ["Haldi Doodh", "golden milk"]),
+    ("What are the warning signs of a heart attack?", ["Heart Attack"]),
+    ("face drooping and slurred speech", ["Stroke"]),
+    ("my child is breathing fast with fever", ["Pneumonia", "breathing fast"]),
+    ("number for ambulance", ["108"]),
+    ("malaria in monsoon", ["Malaria"]),
+    ("TB cough for weeks", ["Tuberculosis"]),
+    ("pregnant women anemia iron", ["anemic", "Anemia"]),
+    ("sickle cell test for tribal families", ["Sickle"]),
+    ("what to do after a snake bite", ["Snakebite", "snake"]),
+    ("toothache home remedy", ["clove", "Clove"]),
+    ("nearest health centre to Indral", ["Bhatpur", "Primary Health Ce"]),
+    ("cholera outbreak and dirty water", ["Cholera"]),
+]
+
+
+def first_relevant_rank(hits, expected):
+    for rank, hit in enumerate(hits, start=1):
+        if any(phrase.lower() in hit["document"].lower() for phrase in expected):
+            return rank
+    return None
+
+
+def evaluate(name, search, top_k):
+    ranks, latencies = [], []
+    for query, expected in QUERIES:
+        started = time.perf_counter()
+        hits = search(query)[:top_k]
+        latencies.append(time.perf_counter() - started)
+        ranks.append(first_relevant_rank(hits, expected))
+    n = len(QUERIES)
+    return {
+        "mode": name,
+        "queries": n,
+        "top_k": top_k,
+        "hit_at_1": sum(1 for r in ranks if r == 1) / n,
+        f"hit_at_{top_k}": sum(1 for r in ranks if r is not None) / n,
+        "mrr": sum(1 / r for r in ranks if r is not None) / n,
+        "latency_ms_p50": percentile(latencies, 50) * 1000,
+        "latency_ms_p95": percentile(latencies, 95) * 1000,
+        "misses": [q for (q, _), r in zip(QUERIES, ranks) if r is None],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Retrieval quality and latency benchmark")
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--rerank-model", default="", help="Cross-encoder to evaluate as a reranking stage")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    retriever = RAG.Retriever()
+    retriever.mode = "hybrid"
+    retriever.load()
+    candidates = max(args.top_k, RAG.HYBRID_CANDIDATES)
+    chunk_map = retriever.chunk_map
+
+    def dense(query):
+        return retriever.store.query([query], top_k=candidates)[0]
+
+    def sparse(query):
+        return [{"id": i, "document": chunk_map[i]} for i, _ in retriever.bm25.search(query, candidates)]
+
+    def hybrid(query):
+        return RAG.fuse_hits(dense(query), retriever.bm25.search(query, candidates), chunk_map, top_k=candidates)
+
+    modes = [("dense", dense), ("bm25", sparse), ("hybrid", hybrid)]
+    if args.rerank_model:
+        from sentence_transformers import CrossEncoder
+        reranker = CrossEncoder(args.rerank_model)
+
+        def reranked(query):
+            hits = hybrid(query)
+            scores = reranker.predict([(query, hit["document"]) for hit in hits])
+            return [hit for _, hit in sorted(zip(scores, hits), key=lambda pair: pair[0], reverse=True)]
+        modes.append(("hybrid+rerank", reranked))
+
+    for _, search in modes:
+        search(QUERIES[0][0])  # warm up caches and lazy model state
+    results = [evaluate(name, search, args.top_k) for name, search in modes]
+
+    print(f"{'mode':<15} {'hit@1':>6} {'hit@k':>6} {'mrr':>6} {'p50 ms':>8} {'p95 ms':>8}")
+    for r in results:
+        print(
+            f"{r['mode']:<15} {r['hit_at_1']:6.2f} {r[f'hit_at_{args.top_k}']:6.2f} {r['mrr']:6.2f} "
+            f"{r['latency_ms_p50']:8.2f} {r['latency_ms_p95']:8.2f}"
+        )
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
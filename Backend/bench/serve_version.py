@@ -0,0 +1,115 @@
+"""Serve any checkout of the backend against the fake model server.
+
+Older builds hard-code the Ollama link and build Google clients at import,
+so they cannot be pointed at bench.fake_ollama as they are. This launcher
+patches both before serving, and answers retrieval with fixed chunks of
+the knowledge file so every build does the same (model-free) work per turn:
+
+    git worktree add --detach /tmp/nidaan-before <ref>
+    python -m bench.fake_ollama --port 11435 &
+    python -m bench.serve_version /tmp/nidaan-before/Backend --port 8001 --ollama http://127.0.0.1:11435
+
+Cloud STT/TTS/translation are not available in this mode; benchmark the
+English text endpoints (bench.load_test's defaults) or use stub providers
+on builds that have them.
+"""
+import argparse
+import os
+import sys
+
+import uvicorn
+
+
+class OfflineClient:
+    """Stands in for a Google Cloud client; fails if a request actually needs it."""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __getattr__(self, name):
+        raise RuntimeError("Google Cloud clients are disabled in bench.serve_version")
+
+
+class FixedRetriever:
+    """Returns the same chunks for every query (the embedding model is not loaded)."""
+
+    version = 1
+    ready = True
+
+    def __init__(self, documents):
+        self.documents = documents
+
+    def load(self):
+        pass
+
+    reload = load
+
+    def wait_ready(self, timeout=None):
+        return True
+
+    def _hits(self, top_k):
+        return [{"id": f"fixed-{i}", "document": d, "distance": 0.0} for i, d in enumerate(self.documents[:top_k])]
+
+    def retrieve(self, query, top_k=3):
+        return self.documents[:top_k]
+
+    def search(self, query, top_k=3):
+        return self._hits(top_k)
+
+    def search_many(self, queries, top_k=3, query_embeddings=None):
+        return [self._hits(top_k) for _ in queries]
+
+    def embed(self, texts):
+        import numpy as np
+        return [np.zeros(8, dtype=np.float32) for _ in texts]
+
+    def status(self):
+        return {"ready": True, "chunks": len(self.documents), "backend": "fixed"}
+
+
+def fixed_documents(path, count=3, size=500):
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    return [text[i * size:(i + 1) * size] for i in range(count)]
+
+
+def patch_google_clients():
+    from google.cloud import speech, texttospeech, translate_v2
+    speech.SpeechClient = OfflineClient
+    texttospeech.TextToSpeechClient = OfflineClient
+    translate_v2.Client = OfflineClient
+
+
+def patch_retrieval(rag, documents):
+    retriever = FixedRetriever(documents)
+    # Builds from before the warm retriever load and query the index per turn
+    rag.load_index = lambda *args, **kwargs: (None, None, documents)
+    rag.retrieve_context = lambda message, collection, *args, top_k=3, **kwargs: documents[:top_k]
+    rag.get_retriever = lambda: retriever
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a checkout of the Nidaan AI backend against a fake Ollama")
+    parser.add_argument("backend", help="The checkout's Backend directory")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--ollama", default="http://127.0.0.1:11435", help="Base URL of bench.fake_ollama")
+    parser.add_argument("--knowledge", default="rural_health_knowledge.txt", help="Source of the fixed chunks")
+    args = parser.parse_args()
+
+    backend = os.path.abspath(args.backend)
+    os.chdir(backend)
+    sys.path.insert(0, backend)
+    os.environ["OLLAMA_API_LINK"] = args.ollama
+
+    patch_google_clients()
+    import RAG
+    patch_retrieval(RAG, fixed_documents(args.knowledge))
+    import app
+    # Builds that read the link from the environment already have it; older ones hard-code it
+    app.API_LINK = args.ollama
+
+    uvicorn.run(app.app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Measure how long the server takes to import and to answer its first requests.
+
+Run from the Backend directory; the fake model backend is started for you:
+
+    python -m bench.startup --runs 3
+    STT_PROVIDER=google TTS_PROVIDER=google python -m bench.startup   # with cloud clients
+
+Each run starts a fresh process and records:
+  import_s        time to import app in a fresh interpreter
+  listening_s     launch until the server answers /api/cache-stats
+  ready_s         launch until /api/ready reports the retrieval engine warm
+  first_chat_s    latency of the first /api/chat request once ready
+Providers default to the offline stubs, so no credentials are needed.
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import app; print(time.perf_counter() - t)"
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for(url, started, timeout, ok=lambda r: r.status_code == 200):
+    while time.perf_counter() - started < timeout:
+        try:
+            if ok(httpx.get(url, timeout=1.0)):
+                return time.perf_counter() - started
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.02)
+    return None
+
+
+def measure_import(env):
+    out = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET], env=env, capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def measure_server(env, message, timeout):
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--port", str(port), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        result = {"listening_s": wait_for(f"{url}/api/cache-stats", started, timeout)}
+        result["ready_s"] = wait_for(f"{url}/api/ready", started, timeout) if result["listening_s"] else None
+        result["first_chat_s"] = None
+        if result["ready_s"]:
+            chat_started = time.perf_counter()
+            response = httpx.post(f"{url}/api/chat", data={"message": message, "lang": "en"}, timeout=timeout)
+            if response.status_code == 200:
+                result["first_chat_s"] = time.perf_counter() - chat_started
+        return result
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def run(args):
+    fake = subprocess.Popen(
+        [sys.executable, "-m", "bench.fake_ollama", "--port", str(args.ollama_port),
+         "--tokens", "20", "--token-delay", "0", "--first-token-delay", "0"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    env = {
+        "STT_PROVIDER": "stub",
+        "TTS_PROVIDER": "stub",
+        "TRANSLATION_PROVIDER": "stub",
+        **os.environ,
+        "OLLAMA_API_LINK": f"http://127.0.0.1:{args.ollama_port}",
+    }
+    runs = []
+    try:
+        for _ in range(args.runs):
+            result = {"import_s": measure_import(env)}
+            result.update(measure_server(env, args.message, args.timeout))
+            runs.append(result)
+    finally:
+        fake.terminate()
+        fake.wait()
+    return runs
+
+
+def print_table(runs):
+    fmt = lambda v: f"{v:10.3f}" if v is not None else f"{'-':>10}"
+    print(f"{'run':>4} {'import s':>10} {'listen s':>10} {'ready s':>10} {'1st chat s':>10}")
+    for i, r in enumerate(runs, 1):
+        print(f"{i:>4} {fmt(r['import_s'])} {fmt(r['listening_s'])} {fmt(r['ready_s'])} {fmt(r['first_chat_s'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure Nidaan AI server startup")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--ollama-port", type=int, default=11435)
+    parser.add_argument("--message", default="I have had a mild fever since yesterday, what should I do?")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Seconds to wait for each startup milestone")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    runs = run(args)
+    print_table(runs)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(runs, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
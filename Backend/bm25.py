@@ -0,0 +1,81 @@
+import json
+import math
+import os
+import re
+from collections import Counter, defaultdict
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from has have how i if in is it its my of on or our should so "
+    "that the their them there these they this to was we what when where which who why will with you your".split()
+)
+
+
+def tokenize(text):
+    return [t for t in _TOKEN.findall(text.lower()) if t not in _STOPWORDS]
+
+
+class BM25Index:
+    """In-process inverted index with Okapi BM25 scoring.
+
+    Catches exact terms (scheme names like MA Yojana or Chiranjeevi, disease
+    names) that dense embeddings of short queries can rank too low.
+    """
+
+    def __init__(self, ids, documents, k1=1.5, b=0.75):
+        self.ids = list(ids)
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(list)  # term -> [(doc position, term frequency)]
+        self.doc_lengths = []
+        for position, document in enumerate(documents):
+            tokens = tokenize(document)
+            self.doc_lengths.append(len(tokens))
+            for term, freq in Counter(tokens).items():
+                self.postings[term].append((position, freq))
+        self._compute_stats()
+
+    def _compute_stats(self):
+        self.avg_length = sum(self.doc_lengths) / len(self.doc_lengths) if self.doc_lengths else 0.0
+        n = len(self.ids)
+        self.idf = {
+            term: math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self.postings.items()
+        }
+
+    def search(self, query, top_k=10):
+        """Return [(chunk id, score)] for the best matching chunks, best first."""
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for position, freq in self.postings[term]:
+                norm = 1 - self.b + self.b * self.doc_lengths[position] / self.avg_length
+                scores[position] += idf * freq * (self.k1 + 1) / (freq + self.k1 * norm)
+        best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+        return [(self.ids[position], score) for position, score in best]
+
+    def save(self, path):
+        data = {
+            "k1": self.k1,
+            "b": self.b,
+            "ids": self.ids,
+            "doc_lengths": self.doc_lengths,
+            "postings": self.postings,
+        }
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        index = cls([], [], k1=data["k1"], b=data["b"])
+        index.ids = data["ids"]
+        index.doc_lengths = data["doc_lengths"]
+        index.postings = defaultdict(list, {t: [tuple(p) for p in docs] for t, docs in data["postings"].items()})
+        index._compute_stats()
+        return index
@@ -0,0 +1,27 @@
+"""Build or update the Nidaan AI retrieval index.
+
+Run this whenever rural_health_knowledge.txt changes, then call
+POST /api/reload-index (or restart the server) to pick up the new chunks:
+
+    python build_index.py
+    python build_index.py --full --batch-size 32
+    python build_index.py --backend numpy
+"""
+import argparse
+
+import RAG
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or update the Nidaan AI embedding index")
+    parser.add_argument("--text-path", default=RAG.KNOWLEDGE_PATH, help="Knowledge file to index")
+    parser.add_argument("--batch-size", type=int, default=RAG.EMBED_BATCH_SIZE, help="Chunks embedded per batch")
+    parser.add_argument("--full", action="store_true", help="Drop the collection and re-embed every chunk")
+    parser.add_argument("--backend", choices=["chroma", "numpy"], default=RAG.VECTOR_BACKEND, help="Vector store to build")
+    args = parser.parse_args()
+
+    RAG.build_index(args.text_path, backend=args.backend, batch_size=args.batch_size, full=args.full)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+import json
+import os
+import threading
+import time
+from contextvars import ContextVar
+
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "true").lower() == "true"
+# With this on, a request sending "X-Debug-Trace: 1" gets its full span list logged and returned in a header
+DEBUG_TRACE_ENABLED = os.environ.get("DEBUG_TRACE_ENABLED", "false").lower() == "true"
+
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    """Prometheus histogram with one label, rendered in the text exposition format."""
+
+    def __init__(self, name, help_text, label, buckets=STAGE_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self.buckets = tuple(buckets)
+        self._series = {}  # label value -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, label_value, seconds):
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                series = self._series[label_value] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series[i] += 1
+            series[-2] += seconds
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for label_value, series in sorted(self._series.items()):
+                label = f'{self.label}="{label_value}"'
+                for bound, count in zip(self.buckets, series):
+                    lines.append(f'{self.name}_bucket{{{label},le="{bound}"}} {count}')
+                lines.append(f'{self.name}_bucket{{{label},le="+Inf"}} {series[-1]}')
+                lines.append(f"{self.name}_sum{{{label}}} {series[-2]}")
+                lines.append(f"{self.name}_count{{{label}}} {series[-1]}")
+        return "\n".join(lines)
+
+
+stage_seconds = Histogram("nidaan_stage_seconds", "Time spent in each stage of the chat pipeline.", "stage")
+request_seconds = Histogram("nidaan_request_seconds", "Time to handle a request, including streamed bodies.", "route")
+
+
+class Trace:
+    """Spans recorded while handling one request."""
+
+    def __init__(self, debug=False):
+        self.started = time.perf_counter()
+        self.debug = debug
+        self.spans = []  # (stage, offset from request start, duration), all seconds
+
+    def add(self, stage, start, duration):
+        self.spans.append((stage, start - self.started, duration))
+
+    def server_timing(self):
+        # Stages that run several times (sentences translated or spoken one by one) are summed
+        totals = {}
+        for stage, _, duration in self.spans:
+            totals[stage] = totals.get(stage, 0.0) + duration
+        return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in totals.items())
+
+    def as_list(self):
+        return [
+            {"stage": stage, "start_ms": round(offset * 1000, 1), "duration_ms": round(duration * 1000, 1)}
+            for stage, offset, duration in self.spans
+        ]
+
+
+_current_trace = ContextVar("current_trace", default=None)
+
+
+def observe(stage, start, end=None):
+    """Record a stage that ran from start to end (time.perf_counter values)."""
+    if not METRICS_ENABLED:
+        return
+    duration = (time.perf_counter() if end is None else end) - start
+    stage_seconds.observe(stage, duration)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(stage, start, duration)
+
+
+class _Span:
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        observe(self.stage, self.start)
+        return False
+
+
+class _NoSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(stage):
+    """Time a block: with metrics.span("stt"): ..."""
+    return _Span(stage) if METRICS_ENABLED else _NO_SPAN
+
+
+def render():
+    return "\n".join([stage_seconds.render(), request_seconds.render()]) + "\n"
+
+
+class TimingMiddleware:
+    """Collect a request's spans and report them in a Server-Timing header.
+
+    Written as plain ASGI middleware so the trace stays current while a
+    streaming body is produced. Headers go out before a stream's later stages
+    run, so for streamed replies Server-Timing covers only what finished
+    before the first byte; the debug trace log always has every span.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        debug = DEBUG_TRACE_ENABLED and (b"x-debug-trace", b"1") in scope.get("headers", [])
+        trace = Trace(debug)
+        token = _current_trace.set(trace)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                timing = trace.server_timing()
+                if timing:
+                    headers.append((b"server-timing", timing.encode("latin-1")))
+                if debug:
+                    headers.append((b"x-debug-trace", json.dumps(trace.as_list()).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_trace.reset(token)
+            # The matched route template keeps labels bounded (no audio filenames)
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            request_seconds.observe(route, time.perf_counter() - trace.started)
+            if debug:
+                print(f"Trace {scope['method']} {scope['path']}: {json.dumps(trace.as_list())}")
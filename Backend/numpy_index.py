@@ -0,0 +1,123 @@
+import json
+import os
+
+import numpy as np
+
+EMBEDDINGS_FILE = "embeddings.npy"
+CHUNKS_FILE = "chunks.jsonl"
+MANIFEST_FILE = "manifest.json"
+
+
+class NumpyIndex:
+    """Vector index kept as a memory-mapped .npy matrix of normalized embeddings.
+
+    The sidecar chunks.jsonl holds each row's chunk id, source offset and
+    text. A query is one matrix product against the whole corpus (batched
+    across queries), which for a corpus of a few hundred chunks is faster and
+    far lighter than running ChromaDB. Hits have the same shape as
+    RAG.search_many: id, document, distance (cosine) and metadata.
+    """
+
+    def __init__(self, index_dir, embed):
+        self.index_dir = index_dir
+        self.embed = embed  # texts -> normalized float32 matrix
+        self.embeddings = np.load(os.path.join(index_dir, EMBEDDINGS_FILE), mmap_mode="r")
+        self.ids, self.documents, self.metadatas = [], [], []
+        with open(os.path.join(index_dir, CHUNKS_FILE), "r", encoding="utf-8") as f:
+            for line in f:
+                chunk = json.loads(line)
+                self.ids.append(chunk["id"])
+                self.documents.append(chunk["text"])
+                self.metadatas.append({"chunk_hash": chunk["hash"], "start_index": chunk["start_index"]})
+        if len(self.ids) != self.embeddings.shape[0]:
+            raise ValueError(f"{index_dir} is inconsistent: {len(self.ids)} chunks, {self.embeddings.shape[0]} embeddings")
+
+    def __len__(self):
+        return len(self.ids)
+
+    def query(self, queries, top_k=5, query_embeddings=None):
+        queries = list(queries)
+        if not queries or not self.ids:
+            return [[] for _ in queries]
+        if query_embeddings is None:
+            vectors = self.embed(queries)
+        else:
+            vectors = normalize(np.asarray(query_embeddings, dtype=np.float32))
+        scores = vectors @ self.embeddings.T  # cosine similarity, queries x chunks
+        k = min(top_k, len(self.ids))
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        all_hits = []
+        for row, candidates in enumerate(top):
+            ordered = candidates[np.argsort(-scores[row, candidates])]
+            all_hits.append([
+                {
+                    "id": self.ids[i],
+                    "document": self.documents[i],
+                    "distance": float(1.0 - scores[row, i]),
+                    "metadata": dict(self.metadatas[i]),
+                }
+                for i in ordered
+            ])
+        return all_hits
+
+
+def normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32)
+
+
+def load_manifest(index_dir):
+    path = os.path.join(index_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def build_numpy_index(chunks, index_dir, embed, settings, batch_size=64, full=False):
+    """Write chunks (id -> {"hash", "start_index", "text"}) to index_dir.
+
+    Embeddings of chunks already present with the same settings are reused,
+    so only new text is embedded. Returns (added, removed) chunk counts.
+    """
+    os.makedirs(index_dir, exist_ok=True)
+    reusable = {}
+    manifest = load_manifest(index_dir)
+    if not full and manifest is not None and all(manifest.get(k) == v for k, v in settings.items()):
+        try:
+            previous = NumpyIndex(index_dir, embed)
+            reusable = {chunk_id: np.array(previous.embeddings[row]) for row, chunk_id in enumerate(previous.ids)}
+        except (OSError, ValueError, KeyError):
+            reusable = {}
+
+    ordered = sorted(chunks.items(), key=lambda item: item[1]["start_index"])
+    missing = [chunk_id for chunk_id, _ in ordered if chunk_id not in reusable]
+    for start in range(0, len(missing), batch_size):
+        batch = missing[start:start + batch_size]
+        for chunk_id, vector in zip(batch, embed([chunks[chunk_id]["text"] for chunk_id in batch])):
+            reusable[chunk_id] = vector
+    removed = len(set(reusable) - set(chunks))
+
+    dim = len(next(iter(reusable.values()))) if reusable else 0
+    matrix = np.zeros((len(ordered), dim), dtype=np.float32)
+    for row, (chunk_id, _) in enumerate(ordered):
+        matrix[row] = reusable[chunk_id]
+
+    # Write to temp names and swap in, so a serving process never maps half a file
+    embeddings_tmp = os.path.join(index_dir, "embeddings.tmp.npy")
+    np.save(embeddings_tmp, normalize(matrix) if len(matrix) else matrix)
+    chunks_tmp = os.path.join(index_dir, CHUNKS_FILE + ".tmp")
+    with open(chunks_tmp, "w", encoding="utf-8") as f:
+        for chunk_id, chunk in ordered:
+            f.write(json.dumps({"id": chunk_id, **chunk}, ensure_ascii=False) + "\n")
+    manifest_tmp = os.path.join(index_dir, MANIFEST_FILE + ".tmp")
+    with open(manifest_tmp, "w", encoding="utf-8") as f:
+        json.dump({**settings, "chunks": len(ordered), "dim": dim}, f, indent=2)
+    os.replace(embeddings_tmp, os.path.join(index_dir, EMBEDDINGS_FILE))
+    os.replace(chunks_tmp, os.path.join(index_dir, CHUNKS_FILE))
+    os.replace(manifest_tmp, os.path.join(index_dir, MANIFEST_FILE))
+    return len(missing), removed
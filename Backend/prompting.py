@@ -0,0 +1,128 @@
+import os
+import re
+
+import RAG
+
+PROMPT_TOKEN_BUDGET = int(os.environ.get("PROMPT_TOKEN_BUDGET", "3000"))  # system + history + question with context
+PROMPT_CONTEXT_TOKENS = int(os.environ.get("PROMPT_CONTEXT_TOKENS", "1000"))  # cap for knowledge chunks
+PROMPT_TOKENIZER = os.environ.get("PROMPT_TOKENIZER", "")  # Hugging Face tokenizer name; empty uses an estimate
+
+_PIECES = re.compile(r"\w+|[^\w\s]")
+_tokenizer = None
+
+
+def count_tokens(text):
+    global _tokenizer
+    if PROMPT_TOKENIZER:
+        if _tokenizer is None:
+            from transformers import AutoTokenizer
+            _tokenizer = AutoTokenizer.from_pretrained(PROMPT_TOKENIZER)
+        return len(_tokenizer.encode(text, add_special_tokens=False))
+    # SentencePiece vocabularies average about 4 characters per English token;
+    # words and punctuation marks bound the count from below
+    return max(len(_PIECES.findall(text)), (len(text) + 3) // 4)
+
+
+def _overlap(first, second, limit=4 * RAG.CHUNK_OVERLAP):
+    """Length of the longest suffix of first that is a prefix of second."""
+    for size in range(min(len(first), len(second), limit), 0, -1):
+        if first.endswith(second[:size]):
+            return size
+    return 0
+
+
+def dedupe_chunks(documents, min_overlap=20):
+    """Drop repeated text between chunks.
+
+    Neighbouring chunks share up to CHUNK_OVERLAP characters, so when both
+    are retrieved the shared span is sent twice. Chunks fully contained in
+    an earlier one are dropped, and an overlapping edge is cut from the
+    lower-ranked chunk. Order (best first) is preserved.
+    """
+    kept = []
+    for document in documents:
+        text = document.strip()
+        if not text or any(text in earlier for earlier in kept):
+            continue
+        for earlier in kept:
+            head = _overlap(earlier, text)
+            if head >= min_overlap:
+                text = text[head:].lstrip()
+            tail = _overlap(text, earlier)
+            if tail >= min_overlap:
+                text = text[:-tail].rstrip()
+        if text:
+            kept.append(text)
+    return kept
+
+
+def _history_turns(history):
+    """Group history into [user, assistant] turns, skipping malformed entries."""
+    turns, current = [], []
+    for entry in history:
+        if not (isinstance(entry, dict) and "role" in entry and "content" in entry):
+            continue
+        if entry["role"] not in ("user", "assistant"):
+            continue
+        if entry["role"] == "user" and current:
+            turns.append(current)
+            current = []
+        current.append({"role": entry["role"], "content": entry["content"]})
+    if current:
+        turns.append(current)
+    return turns
+
+
+def _trim_history(turns, budget):
+    """Keep the newest turns that fit in budget. Returns (turns, tokens)."""
+    sizes = [sum(count_tokens(m["content"]) for m in turn) for turn in turns]
+    start, used = len(turns), 0
+    while start > 0 and used + sizes[start - 1] <= budget:
+        start -= 1
+        used += sizes[start]
+    return turns[start:], used
+
+
+def build_chat_messages(system_prompt, history, message, documents, budget=PROMPT_TOKEN_BUDGET,
+                        context_budget=PROMPT_CONTEXT_TOKENS):
+    """Assemble the Ollama messages within a token budget.
+
+    The system prompt always comes first, unchanged, as a stable prefix.
+    Knowledge chunks (best first) are deduplicated and added until the
+    context budget is spent; history fills what is left, dropping the oldest
+    turns first. Returns (messages, token stats).
+    """
+    system_tokens = count_tokens(system_prompt)
+    question_tokens = count_tokens(RAG.build_prompt(message, []))
+    available = max(0, budget - system_tokens - question_tokens)
+
+    context, context_tokens = [], 0
+    chunks = dedupe_chunks(documents)
+    for chunk in chunks:
+        size = count_tokens(chunk) + 1
+        if context_tokens + size > min(context_budget, available):
+            break
+        context.append(chunk)
+        context_tokens += size
+
+    turns = _history_turns(history)
+    kept_turns, history_tokens = _trim_history(turns, available - context_tokens)
+
+    messages = [{"role": "system", "content": system_prompt}]
+    for turn in kept_turns:
+        messages.extend(turn)
+    messages.append({"role": "user", "content": RAG.build_prompt(message, context)})
+
+    stats = {
+        "budget": budget,
+        "total": system_tokens + history_tokens + question_tokens + context_tokens,
+        "system": system_tokens,
+        "history": history_tokens,
+        "question": question_tokens,
+        "context": context_tokens,
+        "turns_kept": len(kept_turns),
+        "turns_dropped": len(turns) - len(kept_turns),
+        "chunks_kept": len(context),
+        "chunks_dropped": len(documents) - len(context),
+    }
+    return messages, stats
@@ -0,0 +1,362 @@
+import io
+import os
+import threading
+import time
+import wave
+
+# Client libraries are imported inside each provider, so only the selected ones get loaded.
+# whisper, nllb and mms run on the local CPU; install requirements-offline.txt for them.
+STT_PROVIDER = os.environ.get("STT_PROVIDER", "google")  # google | whisper | stub
+TTS_PROVIDER = os.environ.get("TTS_PROVIDER", "google")  # google | mms | stub
+TRANSLATION_PROVIDER = os.environ.get("TRANSLATION_PROVIDER", "google")  # google | nllb | stub
+
+WHISPER_MODEL = os.environ.get("WHISPER_MODEL", "small")  # faster-whisper size or path to a converted model
+WHISPER_COMPUTE_TYPE = os.environ.get("WHISPER_COMPUTE_TYPE", "int8")
+NLLB_MODEL = os.environ.get("NLLB_MODEL", "facebook/nllb-200-distilled-600M")
+MMS_TTS_MODEL = os.environ.get("MMS_TTS_MODEL", "facebook/mms-tts-guj")
+LOCAL_MODEL_THREADS = int(os.environ.get("LOCAL_MODEL_THREADS", str(min(4, os.cpu_count() or 1))))
+STUB_PROVIDER_DELAY = float(os.environ.get("STUB_PROVIDER_DELAY", "0"))  # seconds per stub call, mimics a cloud round-trip
+
+
+class LazyProvider:
+    """Builds a provider on first use instead of at import.
+
+    Cloud clients are slow to create and fail without credentials, so
+    features that are never used (speech in text-only mode, translation
+    for English) never construct them. Class attributes such as name and
+    encoding are answered without building the provider.
+    """
+
+    def __init__(self, cls, **kwargs):
+        self._cls = cls
+        self._kwargs = kwargs
+        self._instance = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._instance is not None
+
+    def get(self):
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    self._instance = self._cls(**self._kwargs)
+        return self._instance
+
+    def __getattr__(self, attr):
+        if self._instance is None:
+            value = getattr(self._cls, attr, None)
+            if value is not None and not callable(value):
+                return value
+        return getattr(self.get(), attr)
+
+
+def _wav_bytes(pcm, sample_rate):
+    """Wrap mono 16-bit PCM in a WAV container."""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as out:
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(sample_rate)
+        out.writeframes(pcm)
+    return buffer.getvalue()
+
+
+def _create(registry, kind, provider, lazy, kwargs):
+    if provider not in registry:
+        raise ValueError(f"Unknown {kind} provider: {provider}")
+    if lazy:
+        return LazyProvider(registry[provider], **kwargs)
+    return registry[provider](**kwargs)
+
+
+# === Speech-to-Text ===
+class GoogleSpeechRecognizer:
+    """Transcription with Google Cloud Speech-to-Text"""
+
+    name = "google"
+    local = False
+
+    def __init__(self, client=None):
+        from google.cloud import speech
+        self._speech = speech
+        self.client = client or speech.SpeechClient()
+
+    def transcribe(self, content, language_code="gu-IN", sample_rate_hertz=None):
+        """content is LINEAR16 audio: raw PCM at sample_rate_hertz, or a wav file when sample_rate_hertz is None."""
+        speech = self._speech
+        # Configure the recognition
+        audio = speech.RecognitionAudio(content=content)
+        config = speech.RecognitionConfig(
+            encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
+            language_code=language_code,  # Use the provided language code
+            enable_automatic_punctuation=True,
+            enable_word_time_offsets=False,
+            enable_word_confidence=False,
+        )
+        if sample_rate_hertz:
+            config.sample_rate_hertz = sample_rate_hertz
+
+        # Perform the transcription
+        response = self.client.recognize(config=config, audio=audio)
+
+        # Extract the transcribed text
+        transcribed_text = ""
+        for result in response.results:
+            if result.alternatives:
+                transcribed_text += result.alternatives[0].transcript + " "
+        return transcribed_text.strip()
+
+
+class StubSpeechRecognizer:
+    """Offline stand-in for tests and benchmarks: returns a fixed transcript
+    per language after an optional delay mimicking a remote round-trip.
+    """
+
+    name = "stub"
+    local = False
+
+    def __init__(self, transcripts=None, delay=STUB_PROVIDER_DELAY):
+        self.transcripts = transcripts or {"gu-IN": "મને બે દિવસથી તાવ છે", "en-US": "I have had a fever for two days"}
+        self.delay = delay
+
+    def transcribe(self, content, language_code="gu-IN", sample_rate_hertz=None):
+        if self.delay:
+            time.sleep(self.delay)
+        return self.transcripts.get(language_code, "") if content else ""
+
+
+class WhisperSpeechRecognizer:
+    """On-device transcription with faster-whisper (CTranslate2, int8 on CPU by default)"""
+
+    name = "whisper"
+    local = True
+    sample_rate = 16000  # Whisper's input rate, same as audio_processing.SAMPLE_RATE_HERTZ
+
+    def __init__(self, model=WHISPER_MODEL, compute_type=WHISPER_COMPUTE_TYPE, threads=LOCAL_MODEL_THREADS, beam_size=1):
+        from faster_whisper import WhisperModel
+        self.model = WhisperModel(model, device="cpu", compute_type=compute_type, cpu_threads=threads)
+        self.beam_size = beam_size  # greedy decoding; larger beams are slower for little gain on short questions
+
+    def _samples(self, content, sample_rate_hertz):
+        import numpy as np
+        if sample_rate_hertz is None:
+            # A wav upload that could not be decoded by ffmpeg: read its header instead
+            with wave.open(io.BytesIO(content), "rb") as clip:
+                sample_rate_hertz = clip.getframerate()
+                channels = clip.getnchannels()
+                pcm = clip.readframes(clip.getnframes())
+            samples = np.frombuffer(pcm, dtype=np.int16).reshape(-1, channels).mean(axis=1)
+        else:
+            samples = np.frombuffer(content, dtype=np.int16).astype(np.float32)
+        samples = samples.astype(np.float32) / 32768.0
+        if sample_rate_hertz != self.sample_rate and len(samples):
+            positions = np.linspace(0, len(samples) - 1, int(len(samples) * self.sample_rate / sample_rate_hertz))
+            samples = np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+        return samples
+
+    def transcribe(self, content, language_code="gu-IN", sample_rate_hertz=None):
+        samples = self._samples(content, sample_rate_hertz)
+        segments, _ = self.model.transcribe(
+            samples, language=language_code.split("-")[0], beam_size=self.beam_size, vad_filter=True
+        )
+        return " ".join(segment.text.strip() for segment in segments).strip()
+
+    def warmup(self):
+        # One second of silence loads the weights into memory and initialises the decoder
+        self.transcribe(b"\x00\x00" * self.sample_rate, "gu-IN", self.sample_rate)
+
+
+SPEECH_RECOGNIZERS = {"google": GoogleSpeechRecognizer, "whisper": WhisperSpeechRecognizer, "stub": StubSpeechRecognizer}
+
+
+def create_speech_recognizer(provider=STT_PROVIDER, lazy=False, **kwargs):
+    return _create(SPEECH_RECOGNIZERS, "STT", provider, lazy, kwargs)
+
+
+# === Text-to-Speech ===
+class GoogleSpeechSynthesizer:
+    """Gujarati speech from Google Cloud Text-to-Speech"""
+
+    name = "google"
+    local = False
+    encoding = "MP3"
+
+    def __init__(self, client=None):
+        from google.cloud import texttospeech
+        self._tts = texttospeech
+        self.client = client or texttospeech.TextToSpeechClient()
+
+    def synthesize(self, text, voice_name="gu-IN-Standard-A"):
+        texttospeech = self._tts
+        # Configure the synthesis input
+        synthesis_input = texttospeech.SynthesisInput(text=text)
+
+        # Build the voice request
+        voice = texttospeech.VoiceSelectionParams(
+            language_code="gu-IN",
+            name=voice_name,
+            ssml_gender=texttospeech.SsmlVoiceGender.FEMALE
+        )
+
+        # Select the type of audio file to return
+        audio_config = texttospeech.AudioConfig(
+            audio_encoding=texttospeech.AudioEncoding.MP3
+        )
+
+        # Perform the text-to-speech request
+        response = self.client.synthesize_speech(
+            input=synthesis_input, voice=voice, audio_config=audio_config
+        )
+        return response.audio_content
+
+
+class StubSpeechSynthesizer:
+    """Local stand-in that returns silent WAV audio, for tests and benchmarks.
+
+    The clip length follows the text length and an optional delay mimics a
+    remote synthesis round-trip.
+    """
+
+    name = "stub"
+    local = False
+    encoding = "LINEAR16"
+
+    def __init__(self, delay=STUB_PROVIDER_DELAY, sample_rate=16000, seconds_per_char=0.06):
+        self.delay = delay
+        self.sample_rate = sample_rate
+        self.seconds_per_char = seconds_per_char
+
+    def synthesize(self, text, voice_name="gu-IN-Standard-A"):
+        if self.delay:
+            time.sleep(self.delay)
+        frames = int(self.sample_rate * self.seconds_per_char * max(1, len(text)))
+        return _wav_bytes(b"\x00\x00" * frames, self.sample_rate)
+
+
+class MMSSpeechSynthesizer:
+    """On-device Gujarati speech with Meta's MMS-TTS (a VITS model) through transformers.
+
+    There is a single voice per model, so voice_name is ignored.
+    """
+
+    name = "mms"
+    local = True
+    encoding = "LINEAR16"
+
+    def __init__(self, model=MMS_TTS_MODEL, threads=LOCAL_MODEL_THREADS):
+        import torch
+        from transformers import AutoTokenizer, VitsModel
+        torch.set_num_threads(threads)
+        self._torch = torch
+        self.tokenizer = AutoTokenizer.from_pretrained(model)
+        self.model = VitsModel.from_pretrained(model).eval()
+        self.sample_rate = self.model.config.sampling_rate
+        self._romanizer = None
+        if getattr(self.tokenizer, "is_uroman", False):
+            # Some MMS checkpoints are trained on romanized text
+            import uroman
+            self._romanizer = uroman.Uroman()
+
+    def synthesize(self, text, voice_name=None):
+        import numpy as np
+        if self._romanizer is not None:
+            text = self._romanizer.romanize_string(text)
+        inputs = self.tokenizer(text, return_tensors="pt")
+        with self._torch.inference_mode():
+            waveform = self.model(**inputs).waveform[0].numpy()
+        pcm = (np.clip(waveform, -1.0, 1.0) * 32767).astype(np.int16).tobytes()
+        return _wav_bytes(pcm, self.sample_rate)
+
+    def warmup(self):
+        self.synthesize("નમસ્તે")
+
+
+SPEECH_SYNTHESIZERS = {"google": GoogleSpeechSynthesizer, "mms": MMSSpeechSynthesizer, "stub": StubSpeechSynthesizer}
+
+
+def create_speech_synthesizer(provider=TTS_PROVIDER, lazy=False, **kwargs):
+    return _create(SPEECH_SYNTHESIZERS, "TTS", provider, lazy, kwargs)
+
+
+# === Translation ===
+class GoogleTranslationBackend:
+    """Google Cloud Translation (v2); translates a whole batch in one request"""
+
+    name = "google"
+    local = False
+    max_batch = 128  # API limit on segments per request
+
+    def __init__(self, client=None):
+        from google.cloud import translate_v2 as translate
+        self.client = client or translate.Client()
+
+    def translate_batch(self, texts, source, target):
+        # format_="text" keeps quotes and apostrophes from coming back HTML-escaped
+        results = self.client.translate(list(texts), source_language=source, target_language=target, format_="text")
+        return [result["translatedText"] for result in results]
+
+
+class StubTranslationBackend:
+    """Offline stand-in for tests and benchmarks.
+
+    Known phrases come from the phrasebook; anything else is returned tagged
+    with the target language. An optional delay mimics a network round-trip.
+    """
+
+    name = "stub"
+    local = False
+    max_batch = 128
+
+    def __init__(self, phrasebook=None, delay=STUB_PROVIDER_DELAY):
+        self.phrasebook = phrasebook or {}
+        self.delay = delay
+
+    def translate_batch(self, texts, source, target):
+        if self.delay:
+            time.sleep(self.delay)
+        return [self.phrasebook.get((text, source, target), f"[{target}] {text}") for text in texts]
+
+
+class NLLBTranslationBackend:
+    """On-device translation with Meta's NLLB-200 (distilled 600M by default) through transformers"""
+
+    name = "nllb"
+    local = True
+    max_batch = 16  # sentences per forward pass; larger batches mostly add padding on CPU
+    LANGUAGES = {"gu": "guj_Gujr", "en": "eng_Latn", "hi": "hin_Deva"}
+
+    def __init__(self, model=NLLB_MODEL, threads=LOCAL_MODEL_THREADS, max_new_tokens=256):
+        import torch
+        from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
+        torch.set_num_threads(threads)
+        self._torch = torch
+        self.tokenizer = AutoTokenizer.from_pretrained(model)
+        self.model = AutoModelForSeq2SeqLM.from_pretrained(model).eval()
+        self.max_new_tokens = max_new_tokens
+        # src_lang is tokenizer state; Translator calls in from several threads with different languages
+        self._tokenizer_lock = threading.Lock()
+
+    def translate_batch(self, texts, source, target):
+        with self._tokenizer_lock:
+            self.tokenizer.src_lang = self.LANGUAGES[source]
+            inputs = self.tokenizer(list(texts), return_tensors="pt", padding=True)
+        with self._torch.inference_mode():
+            outputs = self.model.generate(
+                **inputs,
+                forced_bos_token_id=self.tokenizer.convert_tokens_to_ids(self.LANGUAGES[target]),
+                max_new_tokens=self.max_new_tokens,
+                num_beams=1,
+            )
+        return self.tokenizer.batch_decode(outputs, skip_special_tokens=True)
+
+    def warmup(self):
+        self.translate_batch(["I have a fever."], "en", "gu")
+
+
+TRANSLATION_BACKENDS = {"google": GoogleTranslationBackend, "nllb": NLLBTranslationBackend, "stub": StubTranslationBackend}
+
+
+def create_translation_backend(provider=TRANSLATION_PROVIDER, lazy=False, **kwargs):
+    return _create(TRANSLATION_BACKENDS, "translation", provider, lazy, kwargs)
@@ -0,0 +1,64 @@
+import re
+
+# A sentence ends at . ! ? or the Devanagari danda followed by whitespace, or at a
+# line break (bullet lists). Digits around a dot ("2.5") don't end a sentence.
+_SENTENCE_END = re.compile(r"(?<=[.!?।])[\"'”’)\]]*\s+|\n+")
+
+
+def split_sentences(text):
+    """Split text into sentences, keeping the closing punctuation."""
+    parts = []
+    start = 0
+    for match in _SENTENCE_END.finditer(text):
+        sentence = text[start:match.end()].strip()
+        if sentence:
+            parts.append(sentence)
+        start = match.end()
+    tail = text[start:].strip()
+    if tail:
+        parts.append(tail)
+    return parts
+
+
+def line_breaks(whitespace):
+    """The line breaks in the whitespace between two sentences, as translated text lays them out."""
+    return "\n" * whitespace.count("\n")
+
+
+class SentenceBuffer:
+    """Collects streamed tokens and hands back sentences as soon as they are complete.
+
+    Sentences come back as (separator, sentence) pairs; separator is the
+    whitespace since the previous sentence, so line breaks survive when the
+    sentences are put back together.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._separator = ""
+
+    def _take(self, piece):
+        sentence = piece.strip()
+        if not sentence:
+            self._separator += piece
+            return None
+        separator = self._separator + piece[:len(piece) - len(piece.lstrip())]
+        self._separator = piece[len(piece.rstrip()):]
+        return separator, sentence
+
+    def feed(self, token):
+        self._buffer += token
+        complete = []
+        start = 0
+        for match in _SENTENCE_END.finditer(self._buffer):
+            pair = self._take(self._buffer[start:match.end()])
+            if pair:
+                complete.append(pair)
+            start = match.end()
+        self._buffer = self._buffer[start:]
+        return complete
+
+    def flush(self):
+        pair = self._take(self._buffer)
+        self._buffer = ""
+        return [pair] if pair else []
@@ -0,0 +1,125 @@
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+SESSION_TTL_SECONDS = int(os.environ.get("SESSION_TTL_SECONDS", str(6 * 60 * 60)))
+SESSION_MAX_TURNS = int(os.environ.get("SESSION_MAX_TURNS", "6"))  # user/assistant pairs kept for the prompt
+SESSION_DB_PATH = os.environ.get("SESSION_DB_PATH", "")  # empty keeps sessions in memory only
+SESSION_MAX_SESSIONS = int(os.environ.get("SESSION_MAX_SESSIONS", "10000"))
+
+
+class SessionStore:
+    """Server-side conversation history keyed by session id.
+
+    Sessions live in memory and expire after ttl seconds without activity;
+    with db_path set they are also written to sqlite and survive restarts.
+    Only the last max_turns exchanges are kept, which caps the prompt size
+    however long the conversation runs. Past max_sessions the least recently
+    used sessions are dropped: clients that still send their own history get
+    a new session every turn, and those are never used again.
+    """
+
+    def __init__(self, ttl=SESSION_TTL_SECONDS, max_turns=SESSION_MAX_TURNS, db_path=SESSION_DB_PATH,
+                 max_sessions=SESSION_MAX_SESSIONS):
+        self.ttl = ttl
+        self.max_turns = max_turns
+        self.max_sessions = max_sessions
+        self.evictions = 0
+        self._sessions = OrderedDict()  # session_id -> (last_used, history), least recently used first
+        self._lock = threading.Lock()
+        self._last_purge = time.time()
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS sessions (id TEXT PRIMARY KEY, history TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    def create(self, history=None):
+        session_id = secrets.token_urlsafe(16)
+        self.save(session_id, history or [])
+        return session_id
+
+    def get(self, session_id):
+        """Return the session's history, or None if it is unknown or expired."""
+        now = time.time()
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None and self._db is not None:
+                row = self._db.execute("SELECT updated_at, history FROM sessions WHERE id = ?", (session_id,)).fetchone()
+                if row:
+                    entry = (row[0], json.loads(row[1]))
+            if entry is None or now - entry[0] > self.ttl:
+                self._drop(session_id)
+                return None
+            self._sessions[session_id] = (now, entry[1])
+            self._sessions.move_to_end(session_id)
+            self._evict()
+            return [dict(turn) for turn in entry[1]]
+
+    def save(self, session_id, history):
+        history = self.window([
+            {"role": turn["role"], "content": turn["content"]}
+            for turn in history
+            if isinstance(turn, dict) and "role" in turn and "content" in turn
+        ])
+        now = time.time()
+        with self._lock:
+            self._sessions[session_id] = (now, history)
+            self._sessions.move_to_end(session_id)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO sessions (id, history, updated_at) VALUES (?, ?, ?)",
+                    (session_id, json.dumps(history, ensure_ascii=False), now),
+                )
+                self._db.commit()
+            self._evict()
+            if now - self._last_purge > 60:
+                self._purge_expired(now)
+
+    def drop(self, session_id):
+        with self._lock:
+            self._drop(session_id)
+
+    def window(self, history):
+        """Keep the last max_turns user/assistant exchanges."""
+        return history[-2 * self.max_turns:] if self.max_turns > 0 else []
+
+    def _drop(self, session_id):
+        # Caller holds self._lock
+        self._sessions.pop(session_id, None)
+        if self._db is not None:
+            self._db.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+            self._db.commit()
+
+    def _evict(self):
+        # Caller holds self._lock
+        while len(self._sessions) > self.max_sessions:
+            session_id, _ = self._sessions.popitem(last=False)
+            self.evictions += 1
+            if self._db is not None:
+                self._db.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+                self._db.commit()
+
+    def _purge_expired(self, now):
+        # Caller holds self._lock
+        self._last_purge = now
+        for session_id in [sid for sid, (used, _) in self._sessions.items() if now - used > self.ttl]:
+            del self._sessions[session_id]
+        if self._db is not None:
+            self._db.execute("DELETE FROM sessions WHERE updated_at < ?", (now - self.ttl,))
+            # Rows from before a restart are not in memory, so cap the table too
+            self._db.execute(
+                "DELETE FROM sessions WHERE id NOT IN (SELECT id FROM sessions ORDER BY updated_at DESC LIMIT ?)",
+                (self.max_sessions,),
+            )
+            self._db.commit()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
@@ -0,0 +1,16 @@
+import os
+import sys
+import tempfile
+
+# The backend modules are imported as top-level modules, as uvicorn app:app does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Point app-level caches at a scratch directory and use the offline providers
+# before any test imports app
+_scratch = tempfile.mkdtemp(prefix="nidaan-tests-")
+os.environ.setdefault("TTS_CACHE_DIR", os.path.join(_scratch, "tts_cache"))
+os.environ.setdefault("TRANSLATION_CACHE_PATH", os.path.join(_scratch, "translation_cache.sqlite3"))
+os.environ.setdefault("STT_PROVIDER", "stub")
+os.environ.setdefault("TTS_PROVIDER", "stub")
+os.environ.setdefault("TRANSLATION_PROVIDER", "stub")
+os.environ.setdefault("PRELOAD_PROVIDERS", "")
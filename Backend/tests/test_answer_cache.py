@@ -0,0 +1,32 @@
+from answer_cache import AnswerCache
+
+
+def test_hits_need_similar_question_same_chunks_and_model():
+    cache = AnswerCache(threshold=0.9)
+    cache.store([1.0, 0.0], ["c1", "c2"], "nidaan", "answer", index_version=1)
+
+    assert cache.lookup([0.99, 0.05], ["c2", "c1"], "nidaan", index_version=1) == "answer"
+    assert cache.lookup([0.0, 1.0], ["c1", "c2"], "nidaan", index_version=1) is None
+    assert cache.lookup([1.0, 0.0], ["c1"], "nidaan", index_version=1) is None
+    assert cache.lookup([1.0, 0.0], ["c1", "c2"], "other", index_version=1) is None
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (1, 3)
+
+
+def test_new_index_version_and_ttl_invalidate():
+    cache = AnswerCache(threshold=0.9)
+    cache.store([1.0, 0.0], ["c1"], "nidaan", "answer", index_version=1)
+    assert cache.lookup([1.0, 0.0], ["c1"], "nidaan", index_version=2) is None
+    assert cache.stats()["entries"] == 0
+
+    expired = AnswerCache(ttl=-1)
+    expired.store([1.0, 0.0], ["c1"], "nidaan", "answer")
+    assert expired.lookup([1.0, 0.0], ["c1"], "nidaan") is None
+
+
+def test_oldest_groups_are_evicted():
+    cache = AnswerCache(max_entries=2)
+    for chunk in ("c1", "c2", "c3"):
+        cache.store([1.0, 0.0], [chunk], "nidaan", chunk)
+    assert cache.lookup([1.0, 0.0], ["c1"], "nidaan") is None
+    assert cache.lookup([1.0, 0.0], ["c3"], "nidaan") == "c3"
+    assert cache.stats()["evictions"] == 1
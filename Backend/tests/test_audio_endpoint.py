@@ -0,0 +1,57 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import app as app_module
+
+AUDIO = bytes(range(100))
+
+
+@pytest.fixture()
+def client():
+    return TestClient(app_module.app)
+
+
+@pytest.fixture()
+def filename():
+    return app_module.tts_cache.put("range test", "v", "MP3", AUDIO)
+
+
+def test_full_file_has_etag_and_accepts_ranges(client, filename):
+    response = client.get(f"/api/audio/{filename}")
+    assert response.status_code == 200
+    assert response.content == AUDIO
+    assert response.headers["etag"] == '"' + filename.split(".")[0] + '"'
+    assert response.headers["accept-ranges"] == "bytes"
+    assert response.headers["content-type"] == "audio/mpeg"
+
+
+def test_matching_etag_returns_not_modified(client, filename):
+    etag = client.get(f"/api/audio/{filename}").headers["etag"]
+    response = client.get(f"/api/audio/{filename}", headers={"If-None-Match": f'"other", {etag}'})
+    assert response.status_code == 304
+    assert response.content == b""
+
+
+@pytest.mark.parametrize("header, start, end", [
+    ("bytes=10-19", 10, 19),
+    ("bytes=90-", 90, 99),
+    ("bytes=95-500", 95, 99),
+    ("bytes=-5", 95, 99),
+])
+def test_range_requests(client, filename, header, start, end):
+    response = client.get(f"/api/audio/{filename}", headers={"Range": header})
+    assert response.status_code == 206
+    assert response.content == AUDIO[start:end + 1]
+    assert response.headers["content-range"] == f"bytes {start}-{end}/100"
+
+
+@pytest.mark.parametrize("header", ["bytes=100-", "bytes=20-10", "bytes=-", "items=0-1"])
+def test_unsatisfiable_ranges(client, filename, header):
+    response = client.get(f"/api/audio/{filename}", headers={"Range": header})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == "bytes */100"
+
+
+def test_unknown_audio_is_not_found(client):
+    assert client.get("/api/audio/" + "0" * 64 + ".mp3").status_code == 404
+    assert client.get("/api/audio/app.py").status_code == 404
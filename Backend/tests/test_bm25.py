@@ -0,0 +1,40 @@
+import RAG
+from bm25 import BM25Index
+
+DOCUMENTS = {
+    "c1": "MA Yojana gives families free treatment up to five lakh rupees.",
+    "c2": "Dengue spreads through Aedes mosquito bites; watch for high fever and rashes.",
+    "c3": "Chiranjeevi Yojana covers delivery in private hospitals for poor mothers.",
+}
+
+
+def test_bm25_ranks_exact_terms_and_round_trips(tmp_path):
+    index = BM25Index(list(DOCUMENTS), list(DOCUMENTS.values()))
+    assert index.search("Chiranjeevi delivery", top_k=2)[0][0] == "c3"
+    assert index.search("what is the", top_k=2) == []  # stopwords only
+
+    path = str(tmp_path / "bm25.json")
+    index.save(path)
+    assert BM25Index.load(path).search("dengue fever", top_k=3) == index.search("dengue fever", top_k=3)
+
+
+def test_fuse_hits_weights_both_rankings():
+    dense = [{"id": "c1", "document": DOCUMENTS["c1"], "distance": 0.2, "metadata": {}},
+             {"id": "c2", "document": DOCUMENTS["c2"], "distance": 0.4, "metadata": {}}]
+    sparse = [("c3", 7.0), ("c2", 3.0), ("gone", 1.0)]
+
+    fused = RAG.fuse_hits(dense, sparse, DOCUMENTS, top_k=5, dense_weight=0.5)
+
+    # c2 is found by both retrievers, c3 only by BM25 (tied with c1), and unknown ids are skipped
+    assert [hit["id"] for hit in fused] == ["c2", "c3", "c1"]
+    assert fused[1]["distance"] is None and fused[1]["bm25"] == 7.0
+    assert [hit["id"] for hit in RAG.fuse_hits(dense, sparse, DOCUMENTS, top_k=5, dense_weight=1.0)][:2] == ["c1", "c2"]
+
+
+def test_fuse_hits_breaks_top_rank_ties_toward_bm25():
+    dense = [{"id": "c1", "document": DOCUMENTS["c1"], "distance": 0.2, "metadata": {}}]
+    sparse = [("c3", 7.0)]
+
+    # Both are rank 1 in their own list; at equal weights the exact term match wins
+    assert [hit["id"] for hit in RAG.fuse_hits(dense, sparse, DOCUMENTS, dense_weight=0.5)] == ["c3", "c1"]
+    assert [hit["id"] for hit in RAG.fuse_hits(dense, sparse, DOCUMENTS, dense_weight=0.6)] == ["c1", "c3"]
@@ -0,0 +1,163 @@
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+import app as app_module
+from providers import StubSpeechSynthesizer
+
+# How /api/chat lays out the reply in Gujarati: one translated sentence per piece, line breaks kept
+LIST_REPLY = ["Try this:", "\n- Drink", " water\n", "- Rest\nSee a ", "doctor."]
+LIST_REPLY_GU = "[gu] Try this:\n[gu] - Drink water\n[gu] - Rest\n[gu] See a doctor."
+
+
+class FixedRetriever:
+    version = 1
+
+    def search(self, message, top_k=3):
+        return [{"id": "c1", "document": "Drink plenty of clean water.", "distance": 0.1}]
+
+
+class StaggeredSynthesizer(StubSpeechSynthesizer):
+    """Stub TTS with a delay per text, recording the order clips finish in."""
+
+    def __init__(self, delays):
+        super().__init__(delay=0)
+        self.delays = delays
+        self.finished = []
+
+    def synthesize(self, text, voice_name="gu-IN-Standard-A"):
+        time.sleep(self.delays.get(text, 0))
+        audio = super().synthesize(text, voice_name)
+        self.finished.append(text)
+        return audio
+
+
+def ollama_transport(tokens, fail=False):
+    """Ollama's /api/chat as NDJSON chunks; fail drops the connection before the done chunk."""
+    async def body():
+        for token in tokens:
+            yield (json.dumps({"message": {"role": "assistant", "content": token}, "done": False}) + "\n").encode()
+            await asyncio.sleep(0)  # let other tasks run, as waiting on the socket would
+        if fail:
+            raise httpx.ReadError("connection lost")
+        yield (json.dumps({"message": {"role": "assistant", "content": ""}, "done": True}) + "\n").encode()
+
+    return httpx.MockTransport(lambda request: httpx.Response(200, content=body()))
+
+
+@pytest.fixture()
+def client():
+    return TestClient(app_module.app)
+
+
+@pytest.fixture()
+def ollama(monkeypatch):
+    monkeypatch.setattr(app_module.RAG, "get_retriever", lambda: FixedRetriever())
+    monkeypatch.setattr(app_module, "ollama_slots", asyncio.Semaphore(4))
+
+    def reply_with(tokens, fail=False):
+        client = httpx.AsyncClient(transport=ollama_transport(tokens, fail), base_url="http://ollama")
+        monkeypatch.setattr(app_module, "ollama_client", client)
+
+    return reply_with
+
+
+def stream_events(client, endpoint, **kwargs):
+    response = client.post(endpoint, **kwargs)
+    assert response.status_code == 200
+    return [json.loads(line) for line in response.text.splitlines() if line]
+
+
+def test_gujarati_stream_keeps_the_reply_layout(client, ollama):
+    ollama(LIST_REPLY)
+    form = {"message": "મને તાવ છે", "lang": "gu"}
+    full = client.post("/api/chat", data=form).json()
+    events = stream_events(client, "/api/chat/stream", data=form)
+
+    deltas = [event["content"] for event in events if event["type"] == "delta"]
+    assert full["history"][-1]["content"] == LIST_REPLY_GU
+    assert "".join(deltas) == LIST_REPLY_GU
+    assert events[-1]["history"][-1]["content"] == LIST_REPLY_GU
+    assert all(deltas)
+
+
+def test_stream_sends_deltas_then_done_and_saves_the_session(client, ollama):
+    ollama(["Drink ", "water. ", "Rest."])
+    events = stream_events(client, "/api/chat/stream", data={"message": "I have a fever", "lang": "en"})
+
+    assert events[:-1] == [{"type": "delta", "content": token} for token in ["Drink ", "water. ", "Rest."]]
+    done = events[-1]
+    turns = [{"role": "user", "content": "I have a fever"}, {"role": "assistant", "content": "Drink water. Rest."}]
+    assert done == {"type": "done", "session_id": done["session_id"], "history": turns}
+    assert app_module.sessions.get(done["session_id"]) == turns
+
+    # Session clients get only the reply, and the turn is added on the server
+    events = stream_events(client, "/api/chat/stream",
+                           data={"message": "Thanks", "lang": "en", "session_id": done["session_id"]})
+    assert events[-1] == {"type": "done", "session_id": done["session_id"], "reply": "Drink water. Rest."}
+    assert len(app_module.sessions.get(done["session_id"])) == 4
+
+
+def test_stream_failure_sends_an_error_event_and_keeps_the_session(client, ollama):
+    ollama(["Drink "], fail=True)
+    events = stream_events(client, "/api/chat/stream", data={"message": "I have a fever", "lang": "en"})
+
+    assert events[0] == {"type": "delta", "content": "Drink "}
+    error = events[-1]
+    assert error["type"] == "error" and error["error"].startswith("Chat failed")
+    assert error["history"] == []
+    assert not any(event["type"] == "done" for event in events)
+    assert app_module.sessions.get(error["session_id"]) == []
+
+
+def test_audio_stream_sends_the_transcript_first(client, ollama):
+    ollama(["Rest ", "well."])
+    events = stream_events(client, "/api/audio-chat/stream", data={"lang": "en"},
+                           files={"audio": ("question.wav", b"RIFF-not-really-audio", "audio/wav")})
+
+    assert events[0] == {"type": "transcript", "content": "I have had a fever for two days"}
+    assert [event["type"] for event in events[1:]] == ["delta", "delta", "done"]
+    assert events[-1]["history"][0] == {"role": "user", "content": "I have had a fever for two days"}
+
+
+def test_failed_stream_cancels_pending_sentence_audio(client, ollama, monkeypatch):
+    cancelled = []
+
+    async def slow_tts(text):
+        try:
+            await asyncio.sleep(30)
+        except asyncio.CancelledError:
+            cancelled.append(text)
+            raise
+
+    monkeypatch.setattr(app_module, "tts_audio_url", slow_tts)
+    ollama(["First sentence. ", "Second one. "], fail=True)
+    events = stream_events(client, "/api/chat/stream", data={
+        "message": "I have a fever", "lang": "en", "generate_audio": "true", "audio_mode": "sentences",
+    })
+
+    assert events[-1]["type"] == "error"
+    assert not any(event["type"] == "audio" for event in events)
+    assert sorted(cancelled) == ["First sentence.", "Second one."]
+
+
+def test_sentence_audio_events_keep_reply_order(client, ollama, monkeypatch):
+    sentences = ["Drink clean water slowly.", "Rest in the shade.", "See a doctor if it lasts."]
+    # The first sentence takes longest, so the clips finish in reverse order
+    synthesizer = StaggeredSynthesizer({sentences[0]: 0.3, sentences[1]: 0.15})
+    monkeypatch.setattr(app_module, "speech_synthesizer", synthesizer)
+    ollama([sentence + " " for sentence in sentences])
+    events = stream_events(client, "/api/chat/stream", data={
+        "message": "I have a fever", "lang": "en", "generate_audio": "true", "audio_mode": "sentences",
+    })
+
+    assert synthesizer.finished == sentences[::-1]
+    audio = [event for event in events if event["type"] == "audio"]
+    assert [(event["index"], event["text"]) for event in audio] == list(enumerate(sentences))
+    assert events[-1]["type"] == "done"
+    assert events[-1]["playlist"] == [event["url"] for event in audio]
+    assert all(client.get(url).status_code == 200 for url in events[-1]["playlist"])
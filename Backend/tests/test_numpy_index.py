@@ -0,0 +1,43 @@
+import numpy as np
+
+from bm25 import tokenize
+from numpy_index import NumpyIndex, build_numpy_index
+
+DOCUMENTS = {
+    "c1": "MA Yojana gives families free treatment up to five lakh rupees.",
+    "c2": "Dengue spreads through Aedes mosquito bites; watch for high fever and rashes.",
+    "c3": "Chiranjeevi Yojana covers delivery in private hospitals for poor mothers.",
+}
+
+
+def toy_embed(texts):
+    """Bag-of-words vectors over a tiny vocabulary, enough to rank the toy corpus."""
+    vocab = ["yojana", "treatment", "dengue", "fever", "mosquito", "delivery", "mothers"]
+    rows = [[tokenize(text).count(word) for word in vocab] for text in texts]
+    matrix = np.asarray(rows, dtype=np.float32) + 1e-3
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+
+def test_numpy_index_builds_incrementally_and_queries(tmp_path):
+    index_dir = str(tmp_path / "npindex")
+    chunks = {cid: {"hash": cid, "start_index": i, "text": text} for i, (cid, text) in enumerate(DOCUMENTS.items())}
+    settings = {"embed_model": "toy"}
+    embedded = []
+
+    def embed(texts):
+        embedded.extend(texts)
+        return toy_embed(texts)
+
+    assert build_numpy_index(chunks, index_dir, embed, settings) == (3, 0)
+    del chunks["c1"]
+    chunks["c4"] = {"hash": "c4", "start_index": 3, "text": "Mosquito nets prevent dengue."}
+    assert build_numpy_index(chunks, index_dir, embed, settings) == (1, 1)
+    assert len(embedded) == 4  # only the new chunk was embedded the second time
+
+    index = NumpyIndex(index_dir, toy_embed)
+    assert index.ids == ["c2", "c3", "c4"]
+    hits = index.query(["dengue mosquito fever", "delivery for mothers"], top_k=2)
+    assert [hit["id"] for hit in hits[0]] == ["c2", "c4"]
+    assert hits[1][0]["id"] == "c3"
+    assert hits[1][0]["metadata"]["start_index"] == 2
+    assert 0.0 <= hits[1][0]["distance"] < hits[1][1]["distance"]
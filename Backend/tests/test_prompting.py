@@ -0,0 +1,45 @@
+import prompting
+import RAG
+
+
+def history(n, words=50):
+    entries = []
+    for i in range(n):
+        entries += [{"role": "user", "content": f"question {i}"}, {"role": "assistant", "content": "ok " * words}]
+    return entries
+
+
+def test_dedupe_chunks_cuts_shared_overlap_and_contained_chunks():
+    first = "MA Yojana gives families free treatment. Register at the nearest PHC with your card."
+    second = "Register at the nearest PHC with your card. Carry your Aadhaar too."
+    assert prompting.dedupe_chunks([first, second, first[:40], "  "]) == [first, "Carry your Aadhaar too."]
+
+
+def test_short_overlaps_are_kept():
+    assert prompting.dedupe_chunks(["Drink water.", "water. Rest"]) == ["Drink water.", "water. Rest"]
+
+
+def test_messages_keep_system_first_and_history_order():
+    messages, stats = prompting.build_chat_messages("system", history(2), "fever?", ["context"], budget=10000)
+    assert messages[0] == {"role": "system", "content": "system"}
+    assert [m["content"] for m in messages[1:-1]] == [m["content"] for m in history(2)]
+    assert messages[-1]["content"] == RAG.build_prompt("fever?", ["context"])
+    assert stats["turns_dropped"] == stats["chunks_dropped"] == 0
+
+
+def test_budget_drops_oldest_turns_and_lowest_ranked_chunks():
+    chunks = [f"chunk {i} " + "word " * 100 for i in range(4)]
+    messages, stats = prompting.build_chat_messages(
+        "system", history(6), "fever?", chunks, budget=600, context_budget=300
+    )
+    assert stats["total"] <= 600
+    assert stats["chunks_kept"] == 2 and stats["chunks_dropped"] == 2
+    assert "chunk 0" in messages[-1]["content"] and "chunk 2" not in messages[-1]["content"]
+    assert stats["turns_dropped"] > 0
+    # Whatever survives is the newest history
+    assert messages[-3]["content"] == "question 5"
+
+
+def test_malformed_history_entries_are_skipped():
+    messages, _ = prompting.build_chat_messages("system", [{"role": "tool", "content": "x"}, "junk", {"role": "user"}], "hi", [])
+    assert len(messages) == 2
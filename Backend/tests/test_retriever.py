@@ -0,0 +1,47 @@
+import pytest
+
+import RAG
+
+
+class ListStore:
+    """Vector store stand-in whose dense ranking is simply the order of its documents."""
+
+    def __init__(self, documents, on_query=None):
+        self.ids = list(documents)
+        self.documents = list(documents.values())
+        self.on_query = on_query
+
+    def embed(self, texts):
+        return [[0.0] for _ in texts]
+
+    def query(self, queries, top_k=5, query_embeddings=None):
+        if self.on_query:
+            self.on_query()
+        hits = [{"id": i, "document": d, "distance": 0.1 * n, "metadata": {}}
+                for n, (i, d) in enumerate(zip(self.ids, self.documents))]
+        return [hits[:top_k] for _ in queries]
+
+
+@pytest.fixture()
+def retriever(monkeypatch, tmp_path):
+    monkeypatch.setattr(RAG, "BM25_INDEX_PATH", str(tmp_path / "bm25.json"))
+    monkeypatch.setattr(RAG, "RERANK_MODEL", "")
+    retriever = RAG.Retriever(backend="test")
+    retriever.mode = "hybrid"
+    return retriever
+
+
+def test_reload_during_a_search_does_not_mix_indexes(retriever, monkeypatch):
+    old = {"c1": "dengue fever and rashes", "c2": "MA Yojana covers treatment"}
+    new = {"n1": "dengue spreads through mosquito bites"}
+    # The reload lands between the dense query and the BM25 search
+    stores = [ListStore(old, on_query=retriever.reload), ListStore(new)]
+    monkeypatch.setattr(RAG, "open_store", lambda backend: stores.pop(0))
+    retriever.load()
+
+    hits = retriever.search("dengue", top_k=5)
+
+    assert {hit["id"] for hit in hits} == set(old)
+    assert retriever.version == 2
+    assert set(retriever.chunk_map) == set(new)
+    assert retriever.status()["chunks"] == 1
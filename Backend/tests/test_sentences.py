@@ -0,0 +1,33 @@
+from sentences import SentenceBuffer, line_breaks, split_sentences
+
+
+def test_split_sentences_keeps_punctuation():
+    text = "Drink water. Rest well! Is it dengue? ઘરે રહો। Done"
+    assert split_sentences(text) == ["Drink water.", "Rest well!", "Is it dengue?", "ઘરે રહો।", "Done"]
+
+
+def test_split_sentences_ignores_decimal_points_and_splits_lines():
+    assert split_sentences("Fever above 102.5 degrees is high.\n- Visit the PHC") == [
+        "Fever above 102.5 degrees is high.",
+        "- Visit the PHC",
+    ]
+
+
+def test_sentence_buffer_emits_complete_sentences_only():
+    buffer = SentenceBuffer()
+    assert buffer.feed("Drink ") == []
+    assert buffer.feed("water. Rest") == [("", "Drink water.")]
+    assert buffer.feed(" well.") == []  # no trailing space yet, the sentence may continue
+    assert buffer.feed(" Then") == [(" ", "Rest well.")]
+    assert buffer.flush() == [(" ", "Then")]
+    assert buffer.flush() == []
+
+
+def test_sentence_buffer_keeps_separators_split_across_tokens():
+    buffer = SentenceBuffer()
+    pieces = []
+    for token in ["\nTry this:", "\n", "- Drink water. ", "\n", "\n- Rest"]:
+        pieces.extend(buffer.feed(token))
+    pieces.extend(buffer.flush())
+    assert pieces == [("\n", "Try this:"), ("\n", "- Drink water."), (" \n\n", "- Rest")]
+    assert [line_breaks(separator) for separator, _ in pieces] == ["\n", "\n", "\n\n"]
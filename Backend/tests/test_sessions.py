@@ -0,0 +1,42 @@
+from sessions import SessionStore
+
+
+def turns(n):
+    history = []
+    for i in range(n):
+        history += [{"role": "user", "content": f"q{i}"}, {"role": "assistant", "content": f"a{i}"}]
+    return history
+
+
+def test_save_keeps_last_turns_and_drops_malformed_entries():
+    store = SessionStore(max_turns=2)
+    session_id = store.create()
+    store.save(session_id, turns(3) + [{"role": "user"}, "junk"])
+    assert store.get(session_id) == turns(3)[2:]
+
+
+def test_expired_and_unknown_sessions_return_none():
+    store = SessionStore(ttl=-1)
+    session_id = store.create(turns(1))
+    assert store.get(session_id) is None
+    assert store.get("missing") is None
+
+
+def test_least_recently_used_sessions_are_evicted(tmp_path):
+    store = SessionStore(max_sessions=2, db_path=str(tmp_path / "sessions.sqlite3"))
+    first, second = store.create(turns(1)), store.create(turns(1))
+    store.get(first)
+    store.create()
+    assert len(store) == 2
+    assert store.evictions == 1
+    assert store.get(second) is None
+    assert store.get(first) == turns(1)
+
+
+def test_sessions_persist_in_sqlite(tmp_path):
+    db_path = str(tmp_path / "sessions.sqlite3")
+    session_id = SessionStore(db_path=db_path).create(turns(1))
+    reopened = SessionStore(db_path=db_path)
+    assert reopened.get(session_id) == turns(1)
+    reopened.drop(session_id)
+    assert SessionStore(db_path=db_path).get(session_id) is None
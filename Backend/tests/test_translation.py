@@ -0,0 +1,62 @@
+from providers import StubTranslationBackend
+from translation import Translator
+
+
+class CountingBackend(StubTranslationBackend):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.batches = []
+
+    def translate_batch(self, texts, source, target):
+        self.batches.append(list(texts))
+        return super().translate_batch(texts, source, target)
+
+
+def test_translate_keeps_layout_and_sends_each_sentence_once():
+    backend = CountingBackend(phrasebook={("Rest.", "en", "gu"): "આરામ કરો."})
+    translator = Translator(backend, cache_path=None)
+
+    result = translator.translate("Rest. Drink water.\nRest.", "en", "gu")
+
+    assert result == "આરામ કરો. [gu] Drink water.\nઆરામ કરો."
+    assert backend.batches == [["Rest.", "Drink water."]]
+
+
+def test_repeated_sentences_hit_memory_then_disk(tmp_path):
+    cache_path = str(tmp_path / "translations.sqlite3")
+    backend = CountingBackend()
+    first = Translator(backend, cache_path=cache_path)
+    first.translate("Rest. Drink water.", "en", "gu")
+    first.translate("Drink water. See a doctor.", "en", "gu")
+
+    stats = first.stats()
+    assert (stats["memory_hits"], stats["misses"], stats["backend_calls"]) == (1, 3, 2)
+    assert backend.batches[1] == ["See a doctor."]
+
+    # A new process reads earlier translations back from sqlite
+    second = Translator(backend, cache_path=cache_path)
+    assert second.translate("See a doctor.", "en", "gu") == "[gu] See a doctor."
+    assert second.stats()["disk_hits"] == 1
+    assert len(backend.batches) == 2
+
+
+def test_memory_cache_evicts_least_recently_used():
+    translator = Translator(StubTranslationBackend(), cache_path=None, max_memory_entries=2)
+    translator.translate("One.", "en", "gu")
+    translator.translate("Two.", "en", "gu")
+    translator.translate("One.", "en", "gu")  # One is now the most recent
+    translator.translate("Three.", "en", "gu")
+
+    translator.translate("One.", "en", "gu")
+    translator.translate("Two.", "en", "gu")
+    stats = translator.stats()
+    assert stats["memory_entries"] == 2
+    assert (stats["memory_hits"], stats["misses"]) == (2, 4)
+
+
+def test_batches_respect_backend_limit():
+    backend = CountingBackend()
+    backend.max_batch = 2
+    translator = Translator(backend, cache_path=None)
+    translator.translate("A. B. C. D. E.", "en", "gu")
+    assert [len(batch) for batch in backend.batches] == [2, 2, 1]
@@ -0,0 +1,81 @@
+import threading
+
+from tts_cache import TTSCache, media_type
+
+
+def test_get_or_create_synthesizes_once(tmp_path):
+    cache = TTSCache(cache_dir=str(tmp_path))
+    calls = []
+
+    def synthesize():
+        calls.append(1)
+        return b"audio"
+
+    first = cache.get_or_create("નમસ્તે", "gu-IN-Standard-A", "MP3", synthesize)
+    second = cache.get_or_create("નમસ્તે", "gu-IN-Standard-A", "MP3", synthesize)
+
+    assert first == second and first.endswith(".mp3")
+    assert len(calls) == 1
+    assert open(cache.lookup(first), "rb").read() == b"audio"
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (1, 1)
+    # Voice and encoding are part of the key
+    assert cache.get_or_create("નમસ્તે", "gu-IN-Standard-B", "MP3", synthesize) != first
+    assert media_type(cache.get_or_create("નમસ્તે", "gu-IN-Standard-A", "LINEAR16", synthesize)) == "audio/wav"
+
+
+def test_concurrent_misses_share_one_synthesis(tmp_path):
+    cache = TTSCache(cache_dir=str(tmp_path))
+    calls = []
+    started = threading.Event()
+
+    def synthesize():
+        calls.append(1)
+        started.wait(0.2)
+        return b"audio"
+
+    threads = [threading.Thread(target=cache.get_or_create, args=("hello", "v", "MP3", synthesize)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    started.set()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+
+
+def test_evicts_least_recently_used_past_the_limits(tmp_path):
+    cache = TTSCache(cache_dir=str(tmp_path), max_entries=2)
+    one = cache.put("one", "v", "MP3", b"1")
+    two = cache.put("two", "v", "MP3", b"2")
+    assert cache.get("one", "v") == one  # two is now the oldest
+    three = cache.put("three", "v", "MP3", b"3")
+
+    assert cache.lookup(two) is None
+    assert cache.lookup(one) and cache.lookup(three)
+    assert cache.stats()["evictions"] == 1
+
+    by_size = TTSCache(cache_dir=str(tmp_path / "small"), max_bytes=5)
+    big = by_size.put("big", "v", "MP3", b"12345")
+    by_size.put("more", "v", "MP3", b"6")
+    assert by_size.lookup(big) is None
+
+
+def test_put_never_evicts_the_file_it_returns(tmp_path):
+    cache = TTSCache(cache_dir=str(tmp_path), max_bytes=4)
+    small = cache.put("small", "v", "MP3", b"12")
+    oversized = cache.put("oversized", "v", "MP3", b"123456")
+    # The clip alone is over max_bytes, so everything older goes but the clip is still served
+    assert cache.lookup(oversized)
+    assert cache.lookup(small) is None
+    # It is the first to go once something else is added
+    assert cache.lookup(cache.put("next", "v", "MP3", b"1")) and cache.lookup(oversized) is None
+
+    no_room = TTSCache(cache_dir=str(tmp_path / "none"), max_entries=0)
+    assert no_room.lookup(no_room.get_or_create("text", "v", "MP3", lambda: b"audio"))
+
+
+def test_cache_survives_restart_and_rejects_bad_names(tmp_path):
+    filename = TTSCache(cache_dir=str(tmp_path)).put("hello", "v", "MP3", b"audio")
+    reopened = TTSCache(cache_dir=str(tmp_path))
+    assert reopened.get("hello", "v") == filename
+    assert reopened.lookup("../app.py") is None
+    assert reopened.lookup("notahash.mp3") is None
@@ -0,0 +1,115 @@
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from sentences import split_sentences
+
+TRANSLATION_CACHE_PATH = os.environ.get("TRANSLATION_CACHE_PATH", "translation_cache.sqlite3")
+TRANSLATION_MEMORY_ENTRIES = int(os.environ.get("TRANSLATION_MEMORY_ENTRIES", "10000"))
+
+
+class Translator:
+    """Sentence-level translation with an in-memory LRU and a persistent sqlite cache.
+
+    Text is split into lines and sentences so that repeated sentences (the
+    disclaimer every reply ends with, common questions) hit the cache even
+    inside a new reply. Only the missing sentences go to the backend, in
+    batches.
+    """
+
+    def __init__(self, backend, cache_path=TRANSLATION_CACHE_PATH, max_memory_entries=TRANSLATION_MEMORY_ENTRIES):
+        self.backend = backend
+        self.max_memory_entries = max_memory_entries
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.backend_calls = 0
+        self._memory = OrderedDict()  # (text, source, target) -> translation, least recently used first
+        self._lock = threading.Lock()
+        self._db = None
+        if cache_path:
+            self._db = sqlite3.connect(cache_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS translations ("
+                "source TEXT NOT NULL, target TEXT NOT NULL, text TEXT NOT NULL, translated TEXT NOT NULL, "
+                "PRIMARY KEY (source, target, text))"
+            )
+            self._db.commit()
+
+    def translate(self, text, source, target):
+        return self.translate_many([text], source, target)[0]
+
+    def translate_many(self, texts, source, target):
+        """Translate several texts, sending only uncached sentences to the backend."""
+        # Each text becomes a list of lines, each line a list of sentences
+        layouts = [[split_sentences(line) for line in text.split("\n")] for text in texts]
+        segments = list(dict.fromkeys(s for layout in layouts for line in layout for s in line))
+
+        translated = self._lookup(segments, source, target)
+        missing = [s for s in segments if s not in translated]
+        for start in range(0, len(missing), self.backend.max_batch):
+            batch = missing[start:start + self.backend.max_batch]
+            results = self.backend.translate_batch(batch, source, target)
+            with self._lock:
+                self.backend_calls += 1
+            translated.update(zip(batch, results))
+            self._store(list(zip(batch, results)), source, target)
+
+        return ["\n".join(" ".join(translated[s] for s in line) for line in layout) for layout in layouts]
+
+    def _lookup(self, segments, source, target):
+        found = {}
+        with self._lock:
+            for segment in segments:
+                key = (segment, source, target)
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[segment] = self._memory[key]
+                    self.memory_hits += 1
+            remaining = [s for s in segments if s not in found]
+            if remaining and self._db is not None:
+                for start in range(0, len(remaining), 500):
+                    chunk = remaining[start:start + 500]
+                    rows = self._db.execute(
+                        "SELECT text, translated FROM translations WHERE source = ? AND target = ? "
+                        f"AND text IN ({','.join('?' * len(chunk))})",
+                        [source, target, *chunk],
+                    ).fetchall()
+                    for text, value in rows:
+                        found[text] = value
+                        self._remember((text, source, target), value)
+                        self.disk_hits += 1
+            self.misses += len(segments) - len(found)
+        return found
+
+    def _store(self, pairs, source, target):
+        with self._lock:
+            for text, value in pairs:
+                self._remember((text, source, target), value)
+            if self._db is not None:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO translations (source, target, text, translated) VALUES (?, ?, ?, ?)",
+                    [(source, target, text, value) for text, value in pairs],
+                )
+                self._db.commit()
+
+    def _remember(self, key, value):
+        # Caller holds self._lock
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "backend": self.backend.name,
+                "memory_entries": len(self._memory),
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "backend_calls": self.backend_calls,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,147 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+
+TTS_CACHE_DIR = os.environ.get("TTS_CACHE_DIR", "tts_cache")
+TTS_CACHE_MAX_BYTES = int(os.environ.get("TTS_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+TTS_CACHE_MAX_ENTRIES = int(os.environ.get("TTS_CACHE_MAX_ENTRIES", "5000"))
+
+EXTENSIONS = {"MP3": "mp3", "LINEAR16": "wav", "OGG_OPUS": "ogg"}
+MEDIA_TYPES = {"mp3": "audio/mpeg", "wav": "audio/wav", "ogg": "audio/ogg"}
+_FILENAME = re.compile(r"^([0-9a-f]{64})\.(mp3|wav|ogg)$")
+
+
+class TTSCache:
+    """Disk-backed cache of synthesized speech, keyed by hash of (text, voice, encoding).
+
+    Filenames are the content key, so concurrent requests never overwrite each
+    other's audio and the same sentence is only synthesized once. Least
+    recently used files are evicted when the size or entry limit is exceeded.
+    """
+
+    def __init__(self, cache_dir=TTS_CACHE_DIR, max_bytes=TTS_CACHE_MAX_BYTES, max_entries=TTS_CACHE_MAX_ENTRIES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # filename -> size in bytes, least recently used first
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        os.makedirs(cache_dir, exist_ok=True)
+        self._scan()
+
+    def _scan(self):
+        # Rebuild the LRU order from modification times (refreshed on every hit)
+        files = []
+        for name in os.listdir(self.cache_dir):
+            if _FILENAME.match(name):
+                stat = os.stat(os.path.join(self.cache_dir, name))
+                files.append((stat.st_mtime, name, stat.st_size))
+        for _, name, size in sorted(files):
+            self._entries[name] = size
+            self._total_bytes += size
+        self._evict()
+
+    @staticmethod
+    def key(text, voice_name, encoding):
+        payload = json.dumps([text, voice_name, encoding], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def path(self, filename):
+        return os.path.join(self.cache_dir, filename)
+
+    def lookup(self, filename):
+        """Return the path of a cached file, or None for unknown or malformed names."""
+        if not _FILENAME.match(filename):
+            return None
+        with self._lock:
+            if filename not in self._entries:
+                return None
+        path = self.path(filename)
+        return path if os.path.exists(path) else None
+
+    def get(self, text, voice_name, encoding="MP3"):
+        filename = f"{self.key(text, voice_name, encoding)}.{EXTENSIONS[encoding]}"
+        with self._lock:
+            if filename in self._entries and os.path.exists(self.path(filename)):
+                self._entries.move_to_end(filename)
+                self.hits += 1
+                try:
+                    os.utime(self.path(filename))
+                except OSError:
+                    pass
+                return filename
+            self.misses += 1
+            return None
+
+    def put(self, text, voice_name, encoding, audio_bytes):
+        filename = f"{self.key(text, voice_name, encoding)}.{EXTENSIONS[encoding]}"
+        # Write to a unique temp file first so readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "wb") as out:
+            out.write(audio_bytes)
+        os.replace(tmp_path, self.path(filename))
+        with self._lock:
+            self._total_bytes -= self._entries.pop(filename, 0)
+            self._entries[filename] = len(audio_bytes)
+            self._total_bytes += len(audio_bytes)
+            self._evict(keep=filename)
+        return filename
+
+    def get_or_create(self, text, voice_name, encoding, synthesize):
+        """Return the cached filename for text, calling synthesize() -> bytes on a miss."""
+        filename = self.get(text, voice_name, encoding)
+        if filename:
+            return filename
+        key = self.key(text, voice_name, encoding)
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        # Concurrent misses for the same text synthesize it only once
+        with key_lock:
+            try:
+                with self._lock:
+                    cached = f"{key}.{EXTENSIONS[encoding]}"
+                    if cached in self._entries:
+                        return cached
+                return self.put(text, voice_name, encoding, synthesize())
+            finally:
+                with self._lock:
+                    self._key_locks.pop(key, None)
+
+    def _evict(self, keep=None):
+        # Caller holds self._lock. keep, the file put() is about to hand out, is never
+        # evicted; a clip bigger than max_bytes stays until the next put
+        while self._entries and (self._total_bytes > self.max_bytes or len(self._entries) > self.max_entries):
+            filename = next(iter(self._entries))
+            if filename == keep:
+                break
+            size = self._entries.pop(filename)
+            self._total_bytes -= size
+            self.evictions += 1
+            try:
+                os.remove(self.path(filename))
+            except OSError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+def media_type(filename):
+    return MEDIA_TYPES.get(filename.rsplit(".", 1)[-1], "application/octet-stream")